@@ -6,12 +6,15 @@
 from flask import Flask, send_from_directory, request, redirect, \
     render_template, session, make_response, url_for, flash
 from flask_cors import CORS
+# for precompressed static files
+from werkzeug.http import parse_accept_header
+from werkzeug.utils import safe_join
+import mimetypes
 import random
 import math
 import os
 # 利用 nocache.py 建立 @nocache decorator, 讓頁面不會留下 cache
 from nocache import nocache
-import re
 import math
 import hashlib
 # use quote_plus() to generate URL
@@ -40,6 +43,15 @@ parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir) 
 _curdir = os.path.join(os.getcwd(), parentdir)
 import init
+# 內容解析與靜態網頁轉檔位於同目錄的 sitegen.py, 不需 Flask 亦可執行
+# main.py 以 from cmsimde import flaskapp 匯入時, 同樣要能找到 sitegen
+if currentdir not in sys.path:
+    sys.path.append(currentdir)
+from sitegen import asset_version, build_static, checkMath, export_content, file_get_contents, \
+    import_pages, invalidate_config_cache, invalidate_content_cache, parse_config, \
+    parse_content, parse_outline, precompress, precompress_tree, precompressed_variants, \
+    read_pages, render_menu, save_page, shell_parts, storage, syntaxhighlight_scripts, \
+    title_index, used_brushes, write_content
 # for start_static function
 #import os
 import subprocess
@@ -68,6 +80,10 @@ config_dir = _curdir + "/config/"
 static_dir = _curdir + "/static/"
 download_dir = _curdir + "/downloads/"
 image_dir = _curdir + "/images/"
+# /static 路由所送出的 cmsimde/static 目錄
+static_folder = currentdir + "/static/"
+# 以 ?v=hash 引用且內容與 asset_manifest.json 相符的檔案, 讓瀏覽器快取一年
+immutable_cache_control = "public, max-age=31536000, immutable"
 
 # 利用 init.py 啟動, 建立所需的相關檔案
 initobj = init.Init()
@@ -77,8 +93,8 @@ ip = init.Init.ip
 dynamic_port = init.Init.dynamic_port
 static_port = init.Init.static_port
 
-# 必須先將 download_dir 設為 static_folder, 然後才可以用於 download 方法中的 app.static_folder 的呼叫
-app = Flask(__name__)
+# 不使用 Flask 內建的 static 路由, /static/ 由 send_file 自 static_folder 送出, 才能送出預先壓縮的檔案
+app = Flask(__name__, static_folder=None)
 CORS(app, support_credentials=False)
 
 # 設置隨後要在 blueprint 應用程式中引用的 global 變數
@@ -153,23 +169,6 @@ def checkLogin():
         return redirect('/edit_page')
     return redirect('/')
 
- 
-def checkMath():
-
-    """Use LaTeX Equation rendering
-    """
-
-    outstring = '''
-<!-- 啟用 LaTeX equations 編輯 -->
-  <!-- <script>
-  MathJax = {
-    tex: {inlineMath: [['$', '$'], ['\\(', '\\)']]}
-  };
-  </script>
-  <script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"></script>-->
-    '''
-    return outstring
-
 
 def correct_url():
 
@@ -269,6 +268,8 @@ def doAcp():
         commit_messages = request.form['commit']
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
+        # 讓 git 提交的 content.htm 包含分頁儲存模式的最新內容
+        export_content()
         # execute acp.bat with commit_messages
         if os.name == 'nt':
             os.system("acp.bat \"" + commit_messages + "\"")
@@ -511,7 +512,41 @@ def downloads(path):
     """Send files in downloads directory
     """
 
-    return send_from_directory(_curdir+"/downloads/", path)
+    return send_precompressed(_curdir+"/downloads/", path)
+
+
+def _precompressed_variant(filename, accept_encoding):
+
+    """Return suffix and encoding of the precompressed copy of filename accepted by the browser, or None
+    """
+
+    accepted = parse_accept_header(accept_encoding)
+    for suffix, encoding in precompressed_variants:
+        if accepted[encoding] and os.path.isfile(filename + suffix):
+            return suffix, encoding
+    return None
+
+
+def send_precompressed(directory, path):
+
+    """Send file under directory, using its .br or .gz copy when the browser accepts it
+    """
+
+    # .br 與 .gz 由 generate_pages, local_blog 或 sitegen.py --precompress 產生, 不在送出時壓縮
+    filename = safe_join(directory, path)
+    if filename is None or not os.path.isfile(filename):
+        return send_from_directory(directory, path)
+    variant = _precompressed_variant(filename, request.headers.get("Accept-Encoding"))
+    if variant is None:
+        response = send_from_directory(directory, path)
+    else:
+        suffix, encoding = variant
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        response = send_from_directory(directory, path + suffix, mimetype=mimetype)
+        response.headers["Content-Encoding"] = encoding
+    if any(os.path.isfile(filename + suffix) for suffix, encoding in precompressed_variants):
+        response.vary.add("Accept-Encoding")
+    return response
 
 
 def downloadselect_access_list(files, starti, endi):
@@ -573,6 +608,8 @@ def edit_page(edit):
     else:
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
+        # 分頁儲存模式需先由各頁面檔案組合出 content.htm
+        export_content()
         pagedata =file_get_contents(config_dir + "content.htm")
         #outstring = tinymce_editor(directory, cgi.escape(pagedata))
         # for python 3.8
@@ -658,16 +695,6 @@ def favicon():
     return send_from_directory(_curdir, 'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
 
-def file_get_contents(filename):
-
-    """Return filename content
-    """
-
-    # open file in utf-8 and return file content
-    with open(filename, encoding="utf-8") as file:
-        return file.read()
-
-
 # 與 file_selector 配合, 用於 Tinymce4 編輯器的檔案選擇
 def file_lister(directory, type=None, page=1, item_per_page=10):
 
@@ -938,64 +965,22 @@ def generate_pages():
     else:
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
-        # 處理重複標題 head 數列， 重複標題則按照次序加上 1, 2, 3...
-        newhead = []
-        for i, v in enumerate(head):
-            # 各重複標題總數
-            totalcount = head.count(v)
-            # 目前重複標題出現總數
-            count = head[:i].count(v)
-            # 針對重複標題者, 附加目前重複標題出現數 +1, 未重複採原標題
-            newhead.append(v + "-" + str(count + 1) if totalcount > 1 else v)
-        # 刪除 content 目錄中所有 html 檔案
-        filelist = [ f for f in os.listdir(_curdir + "/content/") if f.endswith(".html") ]
-        for f in filelist:
-            os.remove(os.path.join(_curdir + "/content/", f))
-        # 這裡需要建立專門寫出 html 的 write_page
-        # index.html
-        with open(_curdir + "/content/index.html", "w", encoding="utf-8") as f:
-            f.write(get_page2(None, newhead, 0))
-        # sitemap
-        with open(_curdir + "/content/sitemap.html", "w", encoding="utf-8") as f:
-            # 為了修改為動態與靜態網頁雙向轉檔, 這裡需要 newhead pickle
-            # sitemap2 需要 newhead
-            f.write(sitemap2(newhead))
-        # 以下轉檔, 改用 newhead 數列
-
-        def visible(element):
-            if element.parent.name in ['style', 'script', '[document]', 'head', 'title']:
-                return False
-            elif re.match('<!--.*-->', str(element.encode('utf-8'))):
-                return False
-            return True
-
-        search_content = []
-        # generate each page html under content directory
-        for i in range(len(newhead)):
-            # 在此必須要將頁面中的 /images/ 字串換為 images/, /downloads/ 換為 downloads/
-            # 因為 Flask 中靠 /images/ 取檔案, 但是一般 html 則採相對目錄取檔案
-            # 此一字串置換在 get_page2 中進行
-            # 加入 tipue search 模式
-            get_page_content = []
-            html_doc = get_page2(newhead[i], newhead, 0, get_page_content)
-            """
-            # html = "<meta property='head' content='H1'>"
-            soup = BeautifulSoup(html)
-            title = soup.find("meta", property="head")
-            print(title["content"])
-            """
-            html_doc = html_doc.replace('<meta charset="utf-8">', '<meta charset="utf-8">\n<meta property="head" content="H'+str(level[i])+'">')
-            soup = bs4.BeautifulSoup(" ".join(get_page_content), "lxml")
-            search_content.append({"title": newhead[i], "text": " ".join(filter(visible, soup.findAll(text=True))), "tags": "", "url": newhead[i] + ".html"})
-            with open(_curdir + "/content/" + newhead[i] + ".html", "w", encoding="utf-8") as f:
-                # 增加以 newhead 作為輸入
-                f.write(html_doc)
-        # GENERATE js file
-        with open(_curdir + "/content/tipuesearch_content.js", "w", encoding="utf-8") as f:
-            f.write("var tipuesearch = {\"pages\": " + str(search_content) + "};")
+        # 轉檔程式位於 sitegen.py, 亦可不經 Flask 以 python3 cmsimde/sitegen.py 執行
+        written, unchanged, removed, broken, minified = build_static()
+        # 列出靜態網頁中找不到目標的 /get_page 連結與網站檔案
+        broken_list = ""
+        for filename, url in broken:
+            broken_list += "<br />" + html_escape(filename) + ": " + html_escape(url)
+        # 啟用 minify_html 時列出這次寫出的頁面所減少的位元組數
+        minified_list = ""
+        for filename, saved in minified:
+            minified_list += "<br />" + html_escape(filename) + ": " + str(saved) + " bytes saved"
         return set_css() + "<div class='container'><nav>" + \
                      directory + "</nav><section><h1>Generate Pages</h1>" + \
                      "已經將網站轉為靜態網頁!" + \
+                     "<br />written: " + str(len(written)) + ", unchanged: " + \
+                     str(len(unchanged)) + ", removed: " + str(len(removed)) + \
+                     ", broken links: " + str(len(broken)) + broken_list + minified_list + \
                      "</section></div></body></html>"
 
 
@@ -1009,12 +994,14 @@ def get_page(heading, edit):
     """Get dynamic page content
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    # 透過 content.idx 只讀取標題與所要求的頁面內容
+    head, level = parse_outline()
+    directory = render_menu(head, level, None)
     if heading is None:
         heading = head[0]
     # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
-    page_order_list, page_content_list = search_content(head, page, heading)
+    page_order_list = title_index(head).get(heading, [])
+    page_content_list = read_pages(page_order_list)
     return_content = ""
     pagedata = ""
     outstring = ""
@@ -1042,148 +1029,24 @@ def get_page(heading, edit):
                                       last_page + " " + next_page + "<br /><hr>"
             pagedata_duplicate = "<h"+level[page_order] + ">" + heading + \
                                           "</h"+level[page_order] + ">" + page_content_list[i]
-            outstring_list.append(last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata_duplicate), page_order))
+            # 瀏覽模式不需要編輯器頁面
+            if edit != 0:
+                outstring_list.append(last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata_duplicate), page_order))
         else:
             return_content += last_page + " " + next_page + "<br /><h1>" +\
                                       heading + "</h1>" + page_content_list[i] + "<br />" + last_page + " " + next_page
             
         pagedata += "<h"+level[page_order] + ">" + heading + "</h" + level[page_order] + ">" + page_content_list[i]
         # 利用 html_escape() 將 specialchar 轉成只能顯示的格式
-        outstring += last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order)
+        if edit != 0:
+            outstring += last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order)
     
     # edit=0 for viewpage
     if edit == 0:
         return set_css() + "<div class='container'><nav>" + \
-                 directory + "</nav><section>" + return_content + "</section></div>" + checkMath() + "</body></html>"
-    # enter edit mode
-    else:
-        # check if administrator
-        if not isAdmin():
-            redirect(url_for('login'))
-        else:
-            if len(page_order_list) > 1:
-                # 若碰到重複頁面頁印, 且要求編輯, 則導向 edit_page
-                #return redirect("/edit_page")
-                for i in range(len(page_order_list)):
-                    outstring_duplicate += outstring_list[i] + "<br /><hr>"
-                return outstring_duplicate
-            else:
-                return outstring
-
-
-def get_page2(heading, head, edit, get_page_content = None):
-
-    """Get page content and replace certain string for static site
-    """
-
-    not_used_head, level, page = parse_content()
-    # 直接在此將 /images/ 換為 ./../images/, /downloads/ 換為 ./../downloads/, 以 content 為基準的相對目錄設定
-
-    page = [w.replace('src="/images/', 'src="./../images/') for w in page]
-    page = [w.replace('href="/downloads/', 'href="./../downloads/') for w in page]
-    # 配合 object 標註導入 svg data 來源的轉換
-    page = [w.replace('data="/images/', 'data="./../images/') for w in page]
-    # 假如有 src="/static/ace/ 則換為 src="./../static/ace/
-    page = [w.replace('src="/static/', 'src="./../cmsimde/static/') for w in page]
-    # 假如有 src=/downloads 則換為 src=./../../downloads
-    page = [w.replace('src="/downloads', 'src="./../downloads') for w in page]
-    # 假如有 pythonpath:['/static/' 則換為 ./../cmsimde/static/
-    page = [w.replace("pythonpath:['/static/'", "pythonpath:['./../cmsimde/static/'") for w in page]
-    # 針對 wink3 假如有 data-dirname="/static" 換為 data-dirname="./../cmsimde/static"
-    page = [w.replace("data-dirname=\"/static\"", "data-dirname=\"./../cmsimde/static\"") for w in page]
-    # 假如有 /get_page 則需額外使用 regex 進行字串代換, 表示要在靜態網頁直接取網頁 (尚未完成)
-    #page = [w.replace('/get_page', '') for w in page]
-
-    directory = render_menu2(head, level, page)
-    if heading is None:
-        heading = head[0]
-    # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
-    page_order_list, page_content_list = search_content(head, page, heading)
-    if get_page_content != None:
-        get_page_content.extend(page_content_list)
-    return_content = ""
-    pagedata = ""
-    outstring = ""
-    outstring_duplicate = ""
-    pagedata_duplicate = ""
-    outstring_list = []
-    for i in range(len(page_order_list)):
-        page_order = page_order_list[i]
-        if page_order == 0:
-            last_page = ""
-        else:
-            #last_page = head[page_order-1]+ " << <a href='/get_page/" + head[page_order-1] + "'>Previous</a>"
-            last_page = head[page_order-1] + " << <a href='"+head[page_order-1] + ".html'>Previous</a>"
-        if page_order == len(head) - 1:
-            # no next page
-            next_page = ""
-        else:
-            #next_page = "<a href='/get_page/"+head[page_order+1] + "'>Next</a> >> " + head[page_order+1]
-            next_page = "<a href='" + head[page_order+1] + ".html'>Next</a> >> " + head[page_order+1]
-        if len(page_order_list) > 1:
-            return_content += last_page + " " + next_page + "<br /><h1>" + \
-                                      heading + "</h1>" + page_content_list[i] + \
-                                      "<br />" + last_page + " "+ next_page + "<br /><hr>"
-            pagedata_duplicate = "<h"+level[page_order] + ">" + heading + "</h" + level[page_order]+">"+page_content_list[i]
-            outstring_list.append(last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata_duplicate), page_order))
-        else:
-            return_content += last_page + " " + next_page + "<br /><h1>" + \
-                                      heading + "</h1>" + page_content_list[i] + \
-                                      "<br />" + last_page + " " + next_page
-
-        pagedata += "<h" + level[page_order] + ">" + heading + \
-                          "</h" + level[page_order] + ">" + page_content_list[i]
-        # 利用 html_escape() 將 specialchar 轉成只能顯示的格式
-        outstring += last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order)
-    
-    # edit=0 for viewpage
-    if edit == 0:
-        return set_css2() + '''<div class='container'><nav>
-        '''+ \
-        directory + "<div id=\"tipue_search_content\">" + return_content + \
-        '''</div>
-        
-    <!-- footer -->
-      <div class="container">
-        <div class="row pt-3 mx-auto">
-            <p>
-            <!-- Link back to Colorlib can't be removed. Template is licensed under CC BY 3.0. -->
-            Copyright &copy;<script>document.write(new Date().getFullYear());</script> All rights reserved | This template is made with <i class="icon-heart" aria-hidden="true"></i> by <a href="https://colorlib.com" target="_blank" >Colorlib</a>
-            <!-- Link back to Colorlib can't be removed. Template is licensed under CC BY 3.0. -->
-            </p>
-        </div>
-      </div>
-    <!-- for footer -->
-    
-        </div> <!-- for site wrap -->
-            <!-- <script src="../cmsimde/static/chimper/js/jquery-3.3.1.min.js"></script> -->
-            <script src="../cmsimde/static/chimper/js/jquery-migrate-3.0.1.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/jquery-ui.js"></script>
-            <script src="../cmsimde/static/chimper/js/popper.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/bootstrap.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/owl.carousel.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/jquery.stellar.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/jquery.countdown.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/jquery.magnific-popup.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/bootstrap-datepicker.min.js"></script>
-            <script src="../cmsimde/static/chimper/js/aos.js"></script>
-            <!--
-            <script src="../cmsimde/static/chimper/js/typed.js"></script>
-                    <script>
-                    var typed = new Typed('.typed-words', {
-                    strings: ["Web Apps"," WordPress"," Mobile Apps"],
-                    typeSpeed: 80,
-                    backSpeed: 80,
-                    backDelay: 4000,
-                    startDelay: 1000,
-                    loop: true,
-                    showCursor: true
-                    });
-                    </script>
-            -->
-            <script src="../cmsimde/static/chimper/js/main.js"></script>
-        ''' + checkMath() + '''</body></html>
-        '''
+                 directory + "</nav><section>" + return_content + "</section></div>" + \
+                 syntaxhighlight_scripts("/static/", used_brushes(page_content_list)) + \
+                 checkMath() + "</body></html>"
     # enter edit mode
     else:
         # check if administrator
@@ -1836,6 +1699,8 @@ def local_blog():
 
     if isAdmin():
         os.system("pelican markdown -o blog -s local_publishconf.py")
+        if precompress:
+            precompress_tree(_curdir + "/blog/")
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
 
@@ -1867,6 +1732,7 @@ def markdown_action():
         filename = os.path.join(markdown_dir, f'{title}.md')
         with open(filename, 'w', encoding='utf-8') as file:
             file.write(body.replace('\r\n', '\n'))
+        invalidate_content_cache()
 
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
@@ -1951,175 +1817,6 @@ Solid Edge
         return redirect("/login")
 
 
-def parse_config():
-
-    """Parse config
-    """
-
-    # if there is no config/config automatically generate one with content "admin"
-    if not os.path.isfile(config_dir+"config"):
-        # create config file if there is no config file
-        # default password is admin
-        password = "admin"
-        hashed_password = hashlib.sha512(password.encode('utf-8')).hexdigest()
-        with open(config_dir + "config", "w", encoding="utf-8") as f:
-            f.write(hashed_password)
-
-    # if there is no config/sitetitle automatically generate one with content "cmsimde"
-    if not os.path.isfile(config_dir+"sitetitle"):
-        # default sitetitle is "cmsimde"
-        with open(config_dir + "sitetitle", "w", encoding="utf-8") as f:
-            f.write("cmsimde")
-
-    # read site_title from config/sitetitle
-    site_title = file_get_contents(config_dir + "sitetitle")
-    password = file_get_contents(config_dir + "config")
-
-    return site_title, password
-
-
-def _remove_h123_attrs(soup):
-
-    """Remove h1-h3 tag attribute
-    """
-
-    tag_order = 0
-    for tag in soup.find_all(['h1', 'h2', 'h3']):
-        # 假如標註內容沒有字串
-        #if len(tag.text) == 0:
-        if len(tag.contents) ==0:
-            # 且該標註為排序第一
-            if tag_order == 0:
-                tag.string = "First"
-            else:
-          # 若該標註非排序第一, 則移除無內容的標題標註
-                tag.extract()
-        # 針對單一元件的標題標註
-        elif len(tag.contents) == 1:
-            # 若內容非為純文字, 表示內容為其他標註物件
-            if tag.get_text() == "":
-                # 且該標註為排序第一
-                if tag_order == 0:
-                    # 在最前方插入標題
-                    tag.insert_before(soup.new_tag('h1', 'First'))
-                else:
-                    # 移除 h1, h2 或 h3 標註, 只留下內容
-                    tag.replaceWithChildren()
-            # 表示單一元件的標題標註, 且標題為單一字串者
-            else:
-                # 判定若其排序第一, 則將 tag.name 為 h2 或 h3 者換為 h1
-                if tag_order == 0 and tag.name != "h1":
-                    tag.name = "h1"
-            # 針對其餘單一字串內容的標註, 則保持原樣
-        # 針對內容一個以上的標題標註
-        #elif len(tag.contents) > 1:
-        else:
-            # 假如該標註內容長度大於 1
-            # 且該標註為排序第一
-            if tag_order == 0:
-                # 先移除 h1, h2 或 h3 標註, 只留下內容
-                #tag.replaceWithChildren()
-                # 在最前方插入標題
-                tag.insert_before(soup.new_tag('h1', 'First'))
-            else:
-                # 只保留標題內容,  去除 h1, h2 或 h3 標註
-                # 為了與前面的內文區隔, 先在最前面插入 br 標註
-                tag.insert_before(soup.new_tag('br'))
-                # 再移除非排序第一的 h1, h2 或 h3 標註, 只留下內容
-                tag.replaceWithChildren()
-        tag_order = tag_order + 1
-
-    return soup
-
-
-def parse_content():
-
-    """Use bs4 and re module functions to parse content.htm
-    """
-
-    #from pybean import Store, SQLiteWriter
-    # if no content.db, create database file with cms table
-    '''
-    if not os.path.isfile(config_dir+"content.db"):
-        library = Store(SQLiteWriter(config_dir+"content.db", frozen=False))
-        cms = library.new("cms")
-        cms.follow = 0
-        cms.title = "head 1"
-        cms.content = "content 1"
-        cms.memo = "first memo"
-        library.save(cms)
-        library.commit()
-    '''
-    # if no content.htm, generate a head 1 and content 1 file
-    if not os.path.isfile(config_dir+"content.htm"):
-        return "Error: no content.htm"
-        '''
-        # create content.htm if there is no content.htm
-        with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
-            f.write("<h1>head 1</h1>content 1")
-        '''
-    subject = file_get_contents(config_dir+"content.htm")
-    # deal with content without content
-    if subject == "":
-        return "Error: no data in content.htm"
-        '''
-        # create content.htm if there is no content.htm
-        with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
-            f.write("<h1>head 1</h1>content 1")
-        subject = "<h1>head 1</h1>content 1"
-        '''
-    # initialize the return lists
-    head_list = []
-    level_list = []
-    page_list = []
-    # make the soup out of the html content
-    soup = bs4.BeautifulSoup(subject, 'html.parser')
-    # 嘗試解讀各種情況下的標題
-    soup = _remove_h123_attrs(soup)
-    # 改寫 content.htm 後重新取 subject
-    with open(config_dir + "content.htm", "wb") as f:
-        f.write(soup.encode("utf-8"))
-    subject = file_get_contents(config_dir+"content.htm")
-    # get all h1, h2, h3 tags into list
-    htag= soup.find_all(['h1', 'h2', 'h3'])
-    n = len(htag)
-    # get the page content to split subject using each h tag
-    temp_data = subject.split(str(htag[0]))
-    if len(temp_data) > 2:
-        subject = str(htag[0]).join(temp_data[1:])
-    else:
-        subject = temp_data[1]
-    if n >1:
-            # i from 1 to i-1
-            for i in range(1, len(htag)):
-                head_list.append(htag[i-1].text.strip())
-                # use name attribute of h* tag to get h1, h2 or h3
-                # the number of h1, h2 or h3 is the level of page menu
-                level_list.append(htag[i-1].name[1])
-                temp_data = subject.split(str(htag[i]))
-                if len(temp_data) > 2:
-                    subject = str(htag[i]).join(temp_data[1:])
-                else:
-                    subject = temp_data[1]
-                # cut the other page content out of htag from 1 to i-1
-                cut = temp_data[0]
-                # add the page content
-                page_list.append(cut)
-    # last i
-    # add the last page title
-    head_list.append(htag[n-1].text.strip())
-    # add the last level
-    level_list.append(htag[n-1].name[1])
-    temp_data = subject.split(str(htag[n-1]))
-    # the last subject
-    subject = temp_data[0]
-    # cut the last page content out
-    cut = temp_data[0]
-    # the last page content
-    page_list.append(cut)
-    return head_list, level_list, page_list
-
-
 def remove_special_characters(text):
     
     """Removes special characters from the given text.
@@ -2133,250 +1830,6 @@ def remove_special_characters(text):
     return cleaned_text
 
 
-def render_menu(head, level, page, sitemap=0):
-    
-    """允許使用者在 h1 標題後直接加上 h3 標題, 或者隨後納入 h4 之後作為標題標註
-    """
-
-    directory = ""
-    # 從 level 數列第一個元素作為開端
-    current_level = level[0]
-    # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
-    if sitemap:
-        directory += "<ul>"
-    else:
-        directory += "<ul id='css3menu1' class='topmenu'>"
-    # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
-    for index in range(len(head)):
-        # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
-        this_level = level[index]
-        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
-        if (int(this_level) - int(current_level)) > 1:
-            #this_level = str(int(this_level) - 1)
-            # 考慮若納入 h4 也作為標題標註, 相鄰層級可能大於一層, 因此直接用上一層級 + 1
-            this_level = str(int(current_level) + 1)
-        # 若處理的階次比目前已經處理的階次大, 表示位階較低
-        # 其實當 level[0] 完全不會報告此一區塊
-        # 從正在處理的標題階次與前一個元素比對, 若階次低, 則要加入另一區段的 unordered list 標頭
-        # 兩者皆為 str 會轉為整數後比較
-        if this_level > current_level:
-            directory += "<ul>"
-            directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-        # 假如正在處理的標題與前一個元素同位階, 則必須再判定是否為另一個 h1 的樹狀頭
-        elif this_level == current_level:
-            # 若正在處理的標題確實為樹狀頭, 則標上樹狀頭開始標註
-            if this_level == 1:
-                # 這裡還是需要判定是在建立 sitemap 模式或者選單模式
-                if sitemap:
-                    directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index]+"</a>"
-                else:
-                    directory += "<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-            #  假如不是樹狀頭, 則只列出對應的 list
-            else:
-                directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-        # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
-        else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
-            if this_level == 1:
-                if sitemap:
-                    directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-                else:
-                    directory += "<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-            else:
-                directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
-        current_level = this_level
-    directory += "</li></ul>"
-    return directory
-
-
-def render_menu2(head, level, page, sitemap=0):
-
-    """Render menu for static site
-    """
-
-    site_title, password = parse_config()
-    directory = '''
-    <div class="site-wrap">
-
-    <div class="site-mobile-menu">
-      <div class="site-mobile-menu-header">
-        <div class="site-mobile-menu-close mt-3">
-          <span class="icon-close2 js-menu-toggle"></span>
-        </div>
-      </div>
-      <div class="site-mobile-menu-body"></div>
-    </div>
-    
-            <header class="site-navbar py-4 bg-white" role="banner">
-              <div class="container">
-                <div class="row align-items-center">
-                <h1>''' + site_title + '''</h1>
-                <div class="pl-4">
-                    <form>
-                    <input type="text" placeholder="Search" name="q" id="tipue_search_input" pattern=".{2,}" title="At least 2 characters" required>
-                    </form>
-                </div>
-                  <!-- <div class="col-11 col-xl-2">
-                    <h1 class="mb-0 site-logo"><a href="index.html" class="text-black h2 mb-0">''' + site_title + '''</a></h1> 
-                  </div>
-                  -->
-                  <div class="col-12 col-md-10 d-none d-xl-block">
-                    <nav class="site-navigation position-relative text-right" role="navigation">
-    '''
-    
-    # 從 level 數列第一個元素作為開端, 第一個一定非 level 1 不可
-    current_level = level[0]
-    # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
-    if sitemap:
-        directory += '''<ul>
-<li>
-<form>
-<div class="tipue_search_group">
-<input type="text" name="q" id="tipue_search_input" pattern=".{2,}" title="At least 2 characters" required><button type="submit" class="tipue_search_button"><div class="tipue_search_icon">&#9906;</div></button>
-</div>
-</form>
-</li>
-        '''
-    else:
-        directory += '''<ul class='site-menu js-clone-nav mr-auto d-none d-lg-block'>'''
-    # 納入主頁與表單
-    directory += '''
-                        <li class="active has-children"><a href="index.html">Home</a>
-                        <ul class="dropdown">
-                            <li><a href="sitemap.html">SMap</a></li>
-                            <li><a href="./../reveal/index.html">reveal</a></li>
-                            <li><a href="./../blog/index.html">blog</a></li>
-                        </ul>
-                      </li>
-                     '''
-    # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
-    for index in range(len(head)):
-        # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
-        this_level = level[index]
-        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
-        if (int(this_level) - int(current_level)) > 1:
-            #this_level = str(int(this_level) - 1)
-            # 考慮若納入 h4 也作為標題標註, 相鄰層級可能大於一層, 因此直接用上一層級 + 1
-            this_level = str(int(current_level) + 1)
-        # 若處理的階次比目前已經處理的階次大, 表示位階較低
-        # 其實當 level[0] 完全不會報告此一區塊
-        # 從正在處理的標題階次與前一個元素比對, 若階次低, 則要加入另一區段的 unordered list 標頭
-        # 兩者皆為 str 會轉為整數後比較
-        # 目前的位階在上一個標題之後
-        if this_level > current_level:
-            directory += "<ul class='dropdown'>"
-            # 是否加上 class=has-children, 視下一個而定
-            # 目前處理的標題, 並不是最後一個, 因此有下一個標題待處理
-            if index < (len(head)-1):
-                next_level = level[index+1]
-                if this_level < next_level:
-                    # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-                else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-            else:
-                #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        # 假如正在處理的標題與前一個元素同位階, 則必須再判定是否為另一個 h1 的樹狀頭
-        # 目前標題與上一個標題相同
-        elif this_level == current_level:
-            # 是否加上 class=has-children, 視下一個而定
-            # 目前處理的標題, 並不是最後一個, 因此有下一個標題待處理
-            if index < (len(head)-1):
-                next_level = level[index+1]
-                if this_level < next_level:
-                    # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-                else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-            else:
-                #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
-        else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
-            if index < (len(head)-1):
-                next_level = level[index+1]
-                if this_level < next_level:
-                    # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-                else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-            else:
-                #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        current_level = this_level
-    directory += '''</li>
-                      </ul>
-                </nav>
-              </div>
-              <div class="d-inline-block d-xl-none ml-md-0 mr-auto py-3" style="position: relative; top: 3px;"><a href="#" class="site-menu-toggle js-menu-toggle text-black"><span class="icon-menu h3"></span></a></div>
-              </div>
-
-            </div>
-          </div>
-          
-        </header>
-    '''
-    return directory
-
-
-def render_menu3(head, level, page, sitemap=0):
-
-    """Render menu for static sitemap
-    """
-
-    directory = ""
-    current_level = level[0]
-    if sitemap:
-        directory += "<ul>"
-    else:
-        # before add tipue search function
-        #directory += "<ul id='css3menu1' class='topmenu'>"
-        directory += "<ul id='css3menu1' class='topmenu'><div class=\"tipue_search_group\"><input style=\"width: 6vw;\" type=\"text\" name=\"q\" id=\"tipue_search_input\" pattern=\".{2,}\" title=\"Press enter key to search\" required></div>"
-    for index in range(len(head)):
-        this_level = level[index]
-        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
-        if (int(this_level) - int(current_level)) > 1:
-            #this_level = str(int(this_level) - 1)
-            this_level = str(int(current_level) + 1)
-        if this_level > current_level:
-            directory += "<ul>"
-            #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-            # 改為連結到 content/標題.html
-            directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        elif this_level == current_level:
-            if this_level == 1:
-                if sitemap:
-                    # 改為連結到 content/標題.html
-                    #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-                else:
-                    #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li class='topmenu'><a href='content/" + head[index] + ".html'>" + head[index] + "</a>"
-            else:
-                #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
-            if this_level == 1:
-                if sitemap:
-                    #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-                else:
-                    #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li class='topmenu'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-            else:
-                #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
-        current_level = this_level
-    directory += "</li></ul>"
-    return directory
-
-
 @app.route('/saveConfig', methods=['POST'])
 def saveConfig():
 
@@ -2410,6 +1863,7 @@ def saveConfig():
         file = open(config_dir + "config", "w", encoding="utf-8")
         file.write(hashed_password)
         file.close()
+        invalidate_config_cache()
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>config file saved</h1><a href='/'>Home</a></body></html>"
 
@@ -2434,8 +1888,9 @@ def savePage():
     # in Windows client operator, to avoid textarea add extra \n
     # for ajax save comment the next line
     #page_content = page_content.replace("\n","")
-    with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
-        f.write(page_content)
+    subject = write_content(page_content)
+    if storage == "pages":
+        import_pages(subject)
     return redirect("/edit_page")
 
 
@@ -2444,8 +1899,7 @@ def search_content(head, page, search):
     """Search content
     """
 
-    find = lambda searchList, elem: [[i for i, x in enumerate(searchList) if x == e] for e in elem]
-    search_result = find(head, [search])[0]
+    search_result = title_index(head).get(search, [])
     page_order = []
     page_content = []
     for i in range(len(search_result)):
@@ -2486,7 +1940,11 @@ def send_file(path):
     """Send file function
     """
     
-    return app.send_static_file(static_dir + path)
+    response = send_precompressed(static_folder, path)
+    version = request.args.get("v")
+    if version is not None and version == asset_version("cmsimde/static/" + path):
+        response.headers["Cache-Control"] = immutable_cache_control
+    return response
 
 
 @app.route('/images/<path:path>')
@@ -2505,13 +1963,12 @@ def send_static():
     """Send static files
     """
 
-    return app.send_static_file('index.html')
+    return send_from_directory(static_folder, 'index.html')
 
 
-# set_admin_css for administrator
-def set_admin_css():
+def _static_server_address():
 
-    """Set css for admin
+    """Return ip:port of the static site server, IPv6 address in brackets
     """
 
     server_ip = init.Init.ip
@@ -2527,11 +1984,40 @@ def set_admin_css():
             address_family = socket.AF_INET6
         except socket.error:
             # 如果都不是有效的 IP，假設是 hostname 或 localhost
-            address_family = socket.AF_INET6 if ':' in server_address else socket.AF_INET
+            address_family = socket.AF_INET6 if ':' in server_ip else socket.AF_INET
     if address_family == socket.AF_INET:
         server_address = str(server_ip) + ":" + str(static_port)
     else:
         server_address = "[" + str(server_ip) + "]:" + str(static_port)
+    return server_address
+
+
+def _cached_shell(mode, admin, build):
+
+    """Return the page head and menu shell of mode with the request url filled in
+    """
+
+    parts = shell_parts(mode, admin, build)
+    if len(parts) == 1:
+        return parts[0]
+    return str(correct_url()).join(parts)
+
+
+# set_admin_css for administrator
+def set_admin_css():
+
+    """Set css for admin
+    """
+
+    return _cached_shell("admin", True, _build_admin_css)
+
+
+def _build_admin_css(site_title, admin, edit_url):
+
+    """Build the head and menu shell for admin
+    """
+
+    server_address = _static_server_address()
 
     outstring = '''<!doctype html>
 <html><head>
@@ -2557,7 +2043,6 @@ if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -
 window.location= 'https://' + location.host + location.pathname + location.search;
 </script>
 '''
-    site_title, password = parse_config()
     outstring += '''
 </head><header><h1>''' + site_title + '''</h1> \
 <confmenu>
@@ -2565,7 +2050,7 @@ window.location= 'https://' + location.host + location.pathname + location.searc
 <li><a href="/">Home</a></li>
 <li><a href="/sitemap">SMap</a></li>
 <li><a href="/edit_page">EditA</a></li>
-<li><a href="''' + str(correct_url()) + '''/1">Edit</a></li>
+<li><a href="''' + edit_url + '''/1">Edit</a></li>
 <li><a href="/edit_config">Config</a></li>
 <li><a href="/search_form">Search</a></li>
 <li><a href="/imageuploadform">IUpload</a></li>
@@ -2594,24 +2079,15 @@ def set_css():
     """Set css for dynamic site
     """
     
-    server_ip = init.Init.ip
-    # need to check for IPv4 or IPv6
-    # 根據 IP 地址自動選擇 address family
-    try:
-        # 嘗試解析 IP 地址以確定是 IPv4 還是 IPv6
-        socket.inet_pton(socket.AF_INET, server_ip)
-        address_family = socket.AF_INET
-    except socket.error:
-        try:
-            socket.inet_pton(socket.AF_INET6, server_ip)
-            address_family = socket.AF_INET6
-        except socket.error:
-            # 如果都不是有效的 IP，假設是 hostname 或 localhost
-            address_family = socket.AF_INET6 if ':' in server_address else socket.AF_INET
-    if address_family == socket.AF_INET:
-        server_address = str(server_ip) + ":" + str(static_port)
-    else:
-        server_address = "[" + str(server_ip) + "]:" + str(static_port)
+    return _cached_shell("dynamic", isAdmin(), _build_css)
+
+
+def _build_css(site_title, admin, edit_url):
+
+    """Build the head and menu shell for dynamic site
+    """
+
+    server_address = _static_server_address()
 
     outstring = '''<!doctype html>
 <html><head>
@@ -2642,7 +2118,6 @@ if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -
 window.location= 'https://' + location.host + location.pathname + location.search;
 </script>
 '''
-    site_title, password = parse_config()
     outstring += '''
 </head><header><h1>''' + site_title + '''</h1> \
 <confmenu>
@@ -2650,10 +2125,10 @@ window.location= 'https://' + location.host + location.pathname + location.searc
 <li><a href="/">Home</a></li>
 <li><a href="/sitemap">SMap</a></li>
 '''
-    if isAdmin():
+    if admin:
         outstring += '''
 <li><a href="/edit_page">EditA</a></li>
-<li><a href="''' + str(correct_url()) + '''/1">Edit</a></li>
+<li><a href="''' + edit_url + '''/1">Edit</a></li>
 <li><a href="/edit_config">Config</a></li>
 <li><a href="/search_form">Search</a></li>
 <li><a href="/imageuploadform">IUpload</a></li>
@@ -2682,86 +2157,6 @@ window.location= 'https://' + location.host + location.pathname + location.searc
     return outstring
 
 
-def set_css2():
-
-    """Set css for static site
-    """
-
-    static_head = '''
-        <head>
-        <title>''' + init.Init.site_title + '''</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/icomoon/style.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/magnific-popup.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/jquery-ui.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.carousel.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.theme.default.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap-datepicker.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/flaticon/font/flaticon.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/aos.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/style.css">
-        <link rel="shortcut icon" href="./../cmsimde/static/favicons.png">
-        
-        <style type='text/css'>
-            .site-section {
-            background-color: #FFFF;
-            padding: 40px 40px;
-            }
-            body > div > div.dropdown.open {
-                display: block;
-            }
-        </style>
-    '''
-    outstring = '''<!DOCTYPE html><html>''' + static_head + '''
-        <!-- <script src="./../cmsimde/static/jquery.js"></script> -->
-        <!-- <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.3.1/jquery.min.js"></script> -->
-        <script src="../cmsimde/static/chimper/js/jquery-3.3.1.min.js"></script>
-        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/normalize.min.css">
-        <script src="./../cmsimde/static/tipuesearch/tipuesearch_set.js"></script>
-        <script src="tipuesearch_content.js"></script>
-        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/tipuesearch.css">
-        <script src="./../cmsimde/static/tipuesearch/tipuesearch.js"></script>
-        <!-- for Wink3 客製化關閉 -->
-        <!--
-        <link rel="stylesheet" type="text/css" href="./../cmsimde/static/winkPlayer.css" />
-        <script type="text/javascript" src="./../cmsimde/static/winkPlayer.js"></script>
-        -->
-        <script>
-            /* original tipuesearch
-            $(document).ready(function() {
-                 $('#tipue_search_input').tipuesearch();
-            });
-            */
-            // customed doSearch
-            function doSearch() {
-                $('#tipue_search_input').tipuesearch({
-                    newWindow: true, 
-                    minimumLength: 2,
-                    wholeWords: false, // for search 中文
-                });
-            }
-            $(document).ready(doSearch);
-        </script>
-        ''' + syntaxhighlight2()
-
-    site_title, password = parse_config()
-    if uwsgi:
-        outstring += '''
-<script type="text/javascript">
-if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -1)) \
-window.location= 'https://' + location.host + location.pathname + location.search;
-</script></head><body>
-'''
-    else:
-        outstring += '''
-</head>
-<body>
-'''
-    return outstring
-
-
 def set_footer():
 
     """Footer for page
@@ -2793,22 +2188,6 @@ def sitemap(edit):
              "</section></div></body></html>"
 
 
-def sitemap2(head):
-
-    """Sitemap for static content generation
-    """
-
-    edit = 0
-    not_used_head, level, page = parse_content()
-    directory = render_menu2(head, level, page)
-    # 先改為使用 render_menu3 而非 render_menu2
-    sitemap = render_menu3(head, level, page, sitemap=1)
-    # add tipue search id
-    return set_css2() + "<div class='container'><nav>" + directory + \
-             "</nav><section><h1>SMap</h1><div id=\"tipue_search_content\"></div>" + sitemap + \
-             "</section></div></body></html>"
-
-
 def sizeof_fmt(num):
 
     """Size formate
@@ -2848,31 +2227,35 @@ def ssavePage():
     # 請注意, 若啟用 fullpage plugin 這裡的 page_content tinymce4 會自動加上 html 頭尾標註
     # for ajax save comment the next line
     #page_content = page_content.replace("\n","")
-    head, level, page = parse_content()
+    head, level = parse_outline()
     original_head_title = head[int(page_order)]
-    # 在插入新頁面資料前, 先複製 content.htm 一分到 content_backup.htm
-    shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
     if page_content != "":
-        with open(config_dir + "content.htm", "w", encoding="utf-8") as file:
+        if action != "save":
+            # make orig and new html content into list
+            newSoup = bs4.BeautifulSoup(page_content, "html.parser")
+            newList =[str(tag) for tag in newSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
+            oldPage = read_pages([int(page_order)])[0]
+            oldSoup = bs4.BeautifulSoup(oldPage, "html.parser")
+            oldList =[snTosr(tag) for tag in oldSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
+            mergedList = merge_sequences(oldList, newList)
+            page_content = ""
+            for i in range(len(mergedList)):
+                page_content += mergedList[i]
+        if storage == "pages":
+            # 分頁儲存模式只改寫這一頁的檔案
+            save_page(int(page_order), page_content)
+        else:
+            # 在插入新頁面資料前, 先複製 content.htm 一分到 content_backup.htm
+            shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
+            head, level, page = parse_content()
+            content = []
             for index in range(len(head)):
                 if index == int(page_order):
-                    if action == "save":
-                        file.write(page_content)
-                    else:
-                        # make orig and new html content into list
-                        newSoup = bs4.BeautifulSoup(page_content, "html.parser")
-                        newList =[str(tag) for tag in newSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
-                        oldPage = page[index]
-                        oldSoup = bs4.BeautifulSoup(oldPage, "html.parser")
-                        oldList =[snTosr(tag) for tag in oldSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
-                        mergedList = merge_sequences(oldList, newList)
-                        newContent = ""
-                        for i in range(len(mergedList)):
-                            newContent += mergedList[i]
-                        file.write(newContent)
+                    content.append(page_content)
                 else:
-                    file.write("<h"+str(level[index])+ ">" + str(head[index]) + "</h" + \
-                                  str(level[index])+">"+str(page[index]))
+                    content.append("<h"+str(level[index])+ ">" + str(head[index]) + "</h" + \
+                                          str(level[index])+">"+str(page[index]))
+            write_content("".join(content))
     else:
         return error_log("Error: no content to save!")
     # if every ssavePage generate_pages needed
@@ -2880,7 +2263,7 @@ def ssavePage():
 
     # if head[int(page_order)] still existed and equal original_head_title, go back to origin edit status, otherwise go to "/"
     # here the content is modified, we need to parse the new page_content again
-    head, level, page = parse_content()
+    head, level = parse_outline()
     # for debug
     # print(original_head_title, head[int(page_order)])
     # 嘗試避免因最後一個標題刪除儲存後產生 internal error 問題
@@ -2898,6 +2281,50 @@ def ssavePage():
         return redirect("/")
 
 
+class PrecompressedHandler(http.server.SimpleHTTPRequestHandler):
+
+    """Static server request handler sending .br or .gz copies and caching fingerprinted assets
+    """
+
+    content_encoding = None
+    cache_control = None
+
+    def translate_path(self, path):
+        # 轉檔時以 ?v=hash 標示版本的檔案, 內容改變時網址也會改變
+        url = urllib.parse.urlsplit(path)
+        version = urllib.parse.parse_qs(url.query).get("v")
+        self.cache_control = None
+        if version and version[0] == asset_version(urllib.parse.unquote(url.path).lstrip("/")):
+            self.cache_control = immutable_cache_control
+        path = super().translate_path(path)
+        self.content_encoding = None
+        if os.path.isfile(path):
+            variant = _precompressed_variant(path, self.headers.get("Accept-Encoding"))
+            if variant is not None:
+                suffix, self.content_encoding = variant
+                return path + suffix
+        return path
+
+    def guess_type(self, path):
+        # 壓縮檔的 Content-Type 仍依原檔而定
+        if self.content_encoding is not None:
+            path = os.path.splitext(path)[0]
+        return super().guess_type(path)
+
+    def send_error(self, code, message=None, explain=None):
+        self.content_encoding = None
+        self.cache_control = None
+        super().send_error(code, message, explain)
+
+    def end_headers(self):
+        if self.cache_control is not None:
+            self.send_header("Cache-Control", self.cache_control)
+        if self.content_encoding is not None:
+            self.send_header("Content-Encoding", self.content_encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        super().end_headers()
+
+
 @app.route('/start_static/')
 def start_static():
     """Start local static server in https with IPv4/IPv6 support"""
@@ -2931,7 +2358,7 @@ def start_static():
             # 設定 HTTPS server
             httpd = http.server.HTTPServer(
                 (server_address, server_port),
-                http.server.SimpleHTTPRequestHandler,
+                PrecompressedHandler,
                 bind_and_activate=False
             )
             
@@ -2973,28 +2400,8 @@ def syntaxhighlight():
     """Return syntaxhighlight needed scripts
     """
 
+    # SyntaxHighlighter 的 script 依頁面所用的 brush 由 get_page 加入
     return '''
-<script type="text/javascript" src="/static/syntaxhighlighter/shCore.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushBash.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushDiff.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushJScript.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushJava.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushPython.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushSql.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushHaxe.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushXml.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushPhp.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushPowerShell.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushLua.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushMojo.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushWbt.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushCpp.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushCss.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushCSharp.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushDart.js"></script>
-<script type="text/javascript" src="/static/syntaxhighlighter/shBrushRust.js"></script>
-<link type="text/css" rel="stylesheet" href="/static/syntaxhighlighter/css/shCoreDefault.css"/>
-<script type="text/javascript">SyntaxHighlighter.all();</script>
 <!-- 暫時不用
 <script src="/static/fengari-web.js"></script>
 <script type="text/javascript" src="/static/Cango-13v08-min.js"></script>
@@ -3013,57 +2420,11 @@ img.add_border {
 '''
 
 
-def syntaxhighlight2():
-
-    """Return syntaxhighlight for static pages
-    """
-
-    return '''
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shCore.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushBash.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushDiff.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushJScript.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushJava.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushPython.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushSql.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushHaxe.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushXml.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushPhp.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushPowerShell.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushLua.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushMojo.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushWbt.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushCpp.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushCss.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushCSharp.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushDart.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/syntaxhighlighter/shBrushRust.js"></script>
-<link type="text/css" rel="stylesheet" href="./../cmsimde/static/syntaxhighlighter/css/shCoreDefault.css"/>
-<script type="text/javascript">SyntaxHighlighter.all();</script>
-<!-- 暫時不用
-<script src="./../cmsimde/static/fengari-web.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/Cango-13v08-min.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/CangoAxes-4v01-min.js"></script>
-<script type="text/javascript" src="./../cmsimde/static/gearUtils-05.js"></script>
--->
-<!-- for Brython 暫時不用
-<script src="https://scrum-3.github.io/web/brython/brython.js"></script>
-<script src="https://scrum-3.github.io/web/brython/brython_stdlib.js"></script>
--->
-<style>
-img.add_border {
-    border: 3px solid blue;
-}
-</style>
-'''
-
-
 def tinymce_editor(menu_input=None, editor_content=None, page_order=None):
 
     """Tinymce editor scripts
     """
 
-    sitecontent =file_get_contents(config_dir + "content.htm")
     editor = set_admin_css() + editorhead() + '''</head>''' + editorfoot()
     # edit all pages
     if page_order is None:
@@ -3226,7 +2587,8 @@ def tinymce_editor(menu_input=None, editor_content=None, page_order=None):
                     head[page_order] + \
                     ''''" value='viewpage'></form></section></body></html>'''
     return outstring
-    
+
+
 def unique(items):
 
     """Make items element unique
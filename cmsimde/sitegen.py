@@ -0,0 +1,2513 @@
+# coding: utf-8
+
+"""Content parsing and static site generation, usable without Flask
+
+usage: python3 cmsimde/sitegen.py [--jobs N] [--rollback] [--precompress DIR ...] [--extract-images]
+"""
+
+import os
+import sys
+import re
+import time
+import hashlib
+# for data URI images pasted into content
+import base64
+import binascii
+import threading
+# for /get_page links of static pages
+import urllib.parse
+# for save_page
+import shutil
+# for _write_file temporary files
+import tempfile
+# for _split_content
+import html.parser
+# 為了使用 bs4.element, 改為 import bs4
+import bs4
+# for content.idx section index and build manifest
+import json
+import mmap
+# for load_settings
+from collections import namedtuple
+# for export_static
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+# for content.staging and content.previous swap
+import ctypes
+# for precompressed static output
+import gzip
+try:
+    # brotli 為選用模組, 沒有安裝時只產生 .gz 壓縮檔
+    import brotli
+except ImportError:
+    brotli = None
+# 同一時間只允許一個轉檔程序使用 content.staging
+import contextlib
+try:
+    import fcntl
+except ImportError:
+    # Windows 沒有 fcntl, 改用 msvcrt 鎖定檔案
+    fcntl = None
+    import msvcrt
+# for command line build
+import argparse
+import traceback
+import inspect
+
+# get the parent directory of the file
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+if parentdir not in sys.path:
+    sys.path.insert(0, parentdir)
+_curdir = os.path.join(os.getcwd(), parentdir)
+import init
+
+config_dir = _curdir + "/config/"
+image_dir = _curdir + "/images/"
+uwsgi = init.Init.uwsgi
+
+# 舊版 init.py 沒有 storage 設定, 預設仍將所有頁面存在 content.htm
+storage = getattr(init.Init, "storage", "htm")
+# content.htm 標題解析方式, 可選 "stream", "html.parser" 或 "lxml"
+content_parser = getattr(init.Init, "content_parser", "stream")
+# 靜態網頁轉檔使用的 process 數量, 1 為逐頁產生, 0 則依 CPU 核心數
+export_jobs = getattr(init.Init, "export_jobs", 1)
+# 靜態網頁選單只寫入一個以 hash 命名的 menu-xxxx.js, 各頁面載入後由瀏覽器快取
+shared_menu = getattr(init.Init, "shared_menu", False)
+# 轉檔時另存 .gz 與 .br 壓縮檔, 由伺服器依 Accept-Encoding 直接送出
+precompress = getattr(init.Init, "precompress", False)
+# 靜態網頁引用 cmsimde/static 檔案時加上 ?v=hash, 伺服器可讓瀏覽器長期快取
+fingerprint_assets = getattr(init.Init, "fingerprint_assets", False)
+# 轉檔時去除靜態網頁中的註解與多餘空白, pre, textarea, script 與 style 內容保持不變
+minify_html = getattr(init.Init, "minify_html", False)
+pages_dir = config_dir + "pages/"
+
+# parse_content() 解析結果快取, 以 content.htm 的 (mtime, size, inode) 作為版本鍵值
+# 各 waitress 執行緒共用, 只有在 content.htm 改版或存檔後才重新解析
+_content_cache = {}
+_content_cache_lock = threading.Lock()
+
+# config/sitetitle 與 config/config 讀取後的設定, 以兩個檔案的 (mtime, size) 驗證是否仍有效
+Settings = namedtuple("Settings", ["site_title", "password"])
+_settings_cache = {}
+
+# 靜態網站轉檔用的 site model, head, level 與 page 皆為 tuple, page 已改為靜態網頁的相對連結
+# slugs 為各頁面的靜態網頁檔名 (不含 .html), titles 為檔名對應的頁面次序
+# nav 為各頁面中選單位置的內容, 使用 shared_menu 時為載入 nav_file 的 script 標註
+# broken 為 (網頁檔案, 網址) 的無效連結
+SiteModel = namedtuple("SiteModel", ["head", "level", "page", "slugs", "titles", "menu", "sitemap_menu",
+                                     "nav", "nav_file", "broken"])
+
+# export_static 的 worker process 所使用的 site model
+_export_site = None
+
+# 轉檔用 staging 與保留上一版的 previous 目錄中的 .gitignore 內容
+_ignore_marker = "# cmsimde build directory\n*\n"
+
+# 預先壓縮檔的副檔名與對應的 Content-Encoding, 依優先次序排列
+precompressed_variants = ((".br", "br"), (".gz", "gzip"))
+# 需要預先壓縮的檔案類型
+compressible_types = (".html", ".js", ".css", ".json")
+
+# 靜態網頁中以相對網址引用的網站檔案, group 3 為相對於網站根目錄的路徑
+_asset_url = re.compile(r"""((?:src|href|data)=["'])((?:\./)?\.\./)(cmsimde/static/[^"'?#]+)(?=["'])""")
+# 靜態網頁的網址對照表, 將動態網站使用的網址換為以 content 為基準的相對網址
+static_url_map = {
+    # /images/ 換為 ./../images/, /downloads/ 換為 ./../downloads/
+    'src="/images/': 'src="./../images/',
+    'href="/downloads/': 'href="./../downloads/',
+    # 配合 object 標註導入 svg data 來源的轉換
+    'data="/images/': 'data="./../images/',
+    # 假如有 src="/static/ace/ 則換為 src="./../cmsimde/static/ace/
+    'src="/static/': 'src="./../cmsimde/static/',
+    'src="/downloads': 'src="./../downloads',
+    "pythonpath:['/static/'": "pythonpath:['./../cmsimde/static/'",
+    # 針對 wink3 的 data-dirname
+    'data-dirname="/static"': 'data-dirname="./../cmsimde/static"',
+}
+# init.py 可再增加或改寫對照
+static_url_map.update(getattr(init.Init, "static_url_map", {}))
+# 所有對照字串與 /get_page/標題 連結組成一個 regex, 每頁只需掃描一次, 較長的字串優先比對
+_static_url_pattern = re.compile(r"""(?P<attr>href=["'])/get_page/(?P<title>[^"'#?]*)|""" +
+                                 "|".join(re.escape(url) for url in
+                                          sorted(static_url_map, key=len, reverse=True)))
+# 換為相對網址後, 靜態網頁引用網站檔案的網址, group 1 為相對於網站根目錄的路徑
+_site_file_url = re.compile(r"""(?:src|href|data)=["']\./\.\./([^"'?#]+)""")
+
+# 壓縮靜態網頁時保留原樣的區塊, 未結束的標註則保留到檔案結尾, IE 條件註解亦保留
+# 標註內部整段保留, 屬性值中的空白不可壓縮, 引號中的 > 不視為標註結束
+# space 為標註之間的空白與一般註解組成的片段, 整段換為一個空白或換行
+_minify_tag = r"""(?:"[^"]*"|'[^']*'|[^'">])*>"""
+_minify_pattern = re.compile(r"""(?P<keep><(?P<tag>pre|textarea|script|style)\b""" + _minify_tag +
+                             r"""(?:.*?</(?P=tag)\s*>|.*\Z)|<!--\[if|<(?!!--)/?[A-Za-z!?]""" + _minify_tag + r""")|"""
+                             r"""(?P<space>(?:\s+|<!--(?!\[if).*?-->)+)""", re.S | re.I)
+_html_comment = re.compile(r"<!--.*?-->", re.S)
+
+# 貼入 TinyMCE 的圖片以 data URI 存在頁面中, 存檔時改存為 images 目錄下的檔案
+_data_image = re.compile(r"""src=(?P<quote>["'])data:image/(?P<type>[\w.+-]+);base64,(?P<data>[A-Za-z0-9+/=\s]*)(?P=quote)""")
+# data URI 的 MIME subtype 與圖檔副檔名, 其他類型仍保留在頁面中
+_image_types = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "jpg": ".jpg",
+    "gif": ".gif",
+    "webp": ".webp",
+    "bmp": ".bmp",
+    "svg+xml": ".svg",
+    "x-icon": ".ico",
+}
+
+# 靜態網頁檔名不可使用的字元, 包含網址中有特殊意義的 ? # % 與選單 href='' 所用的引號, 以及 Windows 不允許的字元
+_unsafe_slug_chars = re.compile(r"""[\x00-\x1f\x7f/\\?#%:*"'<>|]""")
+# 轉檔產生的 index.html 與 sitemap.html, 以及 Windows 保留的裝置名稱
+_reserved_slugs = {"index", "sitemap", "con", "prn", "aux", "nul"} | \
+                  {"com%d" % i for i in range(1, 10)} | {"lpt%d" % i for i in range(1, 10)}
+
+# SyntaxHighlighter brush 檔案與其 alias, 依原先載入次序排列
+# 頁面中出現 class="brush: alias" 時才載入對應的檔案
+_brush_files = (
+    ("shBrushBash.js", ("bash", "shell")),
+    ("shBrushDiff.js", ("diff", "patch")),
+    ("shBrushJScript.js", ("js", "jscript", "javascript")),
+    ("shBrushJava.js", ("java",)),
+    ("shBrushPython.js", ("py", "python")),
+    ("shBrushSql.js", ("sql",)),
+    ("shBrushHaxe.js", ("haxe", "hx")),
+    ("shBrushXml.js", ("xml", "xhtml", "xslt", "html")),
+    ("shBrushPhp.js", ("php",)),
+    ("shBrushPowerShell.js", ("powershell", "ps")),
+    ("shBrushLua.js", ("lua",)),
+    ("shBrushMojo.js", ("mojo",)),
+    ("shBrushWbt.js", ("webots", "wbt")),
+    ("shBrushCpp.js", ("cpp", "c")),
+    ("shBrushCss.js", ("css",)),
+    ("shBrushCSharp.js", ("c#", "c-sharp", "csharp")),
+    ("shBrushDart.js", ("dart",)),
+    ("shBrushRust.js", ("rust", "rs")),
+)
+_brush_alias = re.compile(r"brush\s*:\s*([\w#+-]+)")
+# config/asset_manifest.json 讀取後的內容, 以檔案的 (mtime, size) 驗證是否仍有效
+_asset_cache = {}
+
+# set_css, set_css2 與 set_admin_css 的頁首字串快取, 以 (mode, site_title, admin) 為鍵值, 只在 saveConfig 後清除
+_shell_cache = {}
+
+
+def checkMath():
+
+    """Use LaTeX Equation rendering
+    """
+
+    outstring = '''
+<!-- 啟用 LaTeX equations 編輯 -->
+  <!-- <script>
+  MathJax = {
+    tex: {inlineMath: [['$', '$'], ['\\(', '\\)']]}
+  };
+  </script>
+  <script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"></script>-->
+    '''
+    return outstring
+
+
+def file_get_contents(filename):
+
+    """Return filename content
+    """
+
+    # open file in utf-8 and return file content
+    with open(filename, encoding="utf-8") as file:
+        return file.read()
+
+
+def _write_file(filename, data):
+
+    """Write bytes data to filename through a temporary file in the same directory
+    """
+
+    # 先寫入暫存檔再取代, 其他行程不會讀到寫到一半的檔案
+    # 暫存檔名各不相同, 多個行程同時改寫同一個檔案時不會取代或刪除對方的暫存檔
+    fd, temp = tempfile.mkstemp(prefix=os.path.basename(filename) + ".", suffix=".tmp",
+                                dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp 建立的檔案只有擁有者可以讀取, 改為與一般檔案相同的權限
+        os.chmod(temp, 0o644)
+        os.replace(temp, filename)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def static_links(page, targets=None, links=None):
+
+    """Rewrite links of a page body relative to the content directory
+    """
+
+    # 依 static_url_map 一次掃描完成所有代換, 以 content 為基準的相對目錄設定
+    # /get_page/標題 依 targets 換為該標題的靜態網頁, 並將 (網址, 網頁檔案) 加入 links, 找不到的網頁檔案為 None
+    def replace(match):
+        title = match.group("title")
+        if title is None:
+            return static_url_map[match.group(0)]
+        if targets is None:
+            return match.group(0)
+        # TinyMCE 將 href 中的 & 存為 &amp;, 先還原字元參照再解碼網址
+        heading = urllib.parse.unquote(html.unescape(title))
+        # /get_page/標題/1 為編輯連結, 在靜態網頁中改為瀏覽該頁
+        if heading.endswith("/1"):
+            heading = heading[:-2]
+        target = targets.get(heading)
+        if links is not None:
+            links.append((match.group(0)[len(match.group("attr")):], target))
+        if target is None:
+            return match.group(0)
+        return match.group("attr") + target
+
+    return _static_url_pattern.sub(replace, page)
+
+
+def _safe_slug(title):
+
+    """Return title made usable as a static file name and url path
+    """
+
+    slug = _unsafe_slug_chars.sub("_", title).strip()
+    # 不以 . 開頭成為隱藏檔, 結尾的 . 在 Windows 會被去除
+    slug = slug.strip(".")
+    # 保留副檔名 .html 與 -n 編號的長度
+    while len(slug.encode("utf-8")) > 200:
+        slug = slug[:-1]
+    if not slug:
+        slug = "page"
+    if slug.lower() in _reserved_slugs:
+        slug += "_"
+    return slug
+
+
+def assign_slugs(head, page, registry):
+
+    """Return static file names of head and the registry to keep for the next build
+    """
+
+    # registry 為 {標題: [[檔名, 內容 hash], ...]}, 記錄上次轉檔時各標題頁面的檔名
+    # 同標題頁面優先沿用內容相同的檔名, 其次依次序沿用, 刪除前面的重複標題頁面時, 後面頁面的網址不變
+    groups = {}
+    for order in range(len(head)):
+        groups.setdefault(head[order], []).append(order)
+    hashes = [_content_hash(page_content) for page_content in page]
+    slugs = [None] * len(head)
+    # Windows 與 macOS 的檔案系統不分大小寫, Intro.html 與 intro.html 是同一個檔案, 因此以 casefold 比對
+    used = set()
+
+    def take(order, slug):
+        if slug.casefold() in used:
+            return False
+        slugs[order] = slug
+        used.add(slug.casefold())
+        return True
+
+    for title, group in groups.items():
+        previous = registry.get(title, [])
+        by_hash = {}
+        for slug, page_hash in previous:
+            by_hash.setdefault(page_hash, []).append(slug)
+        for order in group:
+            candidates = by_hash.get(hashes[order], [])
+            while candidates and not take(order, candidates.pop(0)):
+                pass
+        left = [slug for slug, page_hash in previous]
+        for order in group:
+            while slugs[order] is None and left:
+                take(order, left.pop(0))
+    # 新頁面才配置檔名, 未重複的標題使用原標題, 重複標題則按照次序加上 1, 2, 3...
+    for title, group in groups.items():
+        base = _safe_slug(title)
+        if len(group) == 1 and slugs[group[0]] is None and take(group[0], base):
+            continue
+        number = 1
+        for order in group:
+            if slugs[order] is not None:
+                continue
+            while not take(order, base + "-" + str(number)):
+                number += 1
+    registry = {}
+    for title, group in groups.items():
+        registry[title] = [[slugs[order], hashes[order]] for order in group]
+    return slugs, registry
+
+
+def _load_slug_registry():
+
+    """Return the slug registry of the last static export, {} if there is none
+    """
+
+    try:
+        with open(config_dir + "slug_registry.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_slug_registry(registry):
+
+    """Write the slug registry of static export
+    """
+
+    _write_file(config_dir + "slug_registry.json",
+                json.dumps(registry, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def build_site_model(head, level, page, slugs=None):
+
+    """Return SiteModel of the static site, parsed and rendered once for every page
+    """
+
+    # head 為 content.htm 中的標題, slugs 為對應的靜態網頁檔名, /get_page/標題 依此找出對應的檔案
+    head = tuple(head)
+    level = tuple(level)
+    if slugs is None:
+        slugs = assign_slugs(head, page, {})[0]
+    slugs = tuple(slugs)
+    targets = {}
+    for order in range(len(head)):
+        # 重複標題連結到第一個同名頁面
+        targets.setdefault(head[order], slugs[order] + ".html")
+    pages = []
+    broken = []
+    exists = {}
+    for order in range(len(head)):
+        page_links = []
+        pages.append(static_links(page[order], targets, page_links))
+        for url, target in page_links:
+            if target is None:
+                broken.append((slugs[order] + ".html", url))
+        for path in _site_file_url.findall(pages[-1]):
+            path = urllib.parse.unquote(html.unescape(path))
+            if path not in exists:
+                exists[path] = os.path.exists(os.path.join(_curdir, path))
+            if not exists[path]:
+                broken.append((slugs[order] + ".html", "/" + path))
+    page = tuple(pages)
+    titles = {}
+    for order in range(len(head)):
+        titles.setdefault(slugs[order], []).append(order)
+    menu = render_menu2(head, level, page, slugs=slugs)
+    if shared_menu:
+        nav_file = "menu-" + _content_hash(menu)[:12] + ".js"
+        nav = _menu_loader()
+    else:
+        nav_file = ""
+        nav = menu
+    return SiteModel(head, level, page, slugs, titles, menu,
+                     render_menu3(head, level, page, sitemap=1, slugs=slugs), nav, nav_file,
+                     tuple(broken))
+
+
+def _menu_loader():
+
+    """Return markup that loads the shared static menu in place of the embedded one
+    """
+
+    # 以同步 script 寫入選單, main.js 複製手機版選單時選單已經存在, 以 file:// 開啟亦可使用
+    # 各頁面只引用固定的 menu.js, 選單改變時不必重新產生所有頁面
+    return '<script src="menu.js"></script><noscript><a href="sitemap.html">SMap</a></noscript>'
+
+
+def _menu_redirect(nav_file):
+
+    """Return content of menu.js, which loads the hash-named shared menu file
+    """
+
+    return "document.write('<script src=\"" + nav_file + "\"><\\/script>');\n"
+
+
+def _menu_script(menu):
+
+    """Return content of the shared static menu file
+    """
+
+    # json.dumps 預設跳脫非 ASCII 字元, 不受伺服器所標示的 charset 影響
+    return "document.write(" + json.dumps(menu) + ");\n"
+
+
+def _load_build_manifest():
+
+    """Return the build manifest of the last static export, {} if there is none
+    """
+
+    try:
+        with open(config_dir + "build_manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_build_manifest(manifest):
+
+    """Write the build manifest of static export
+    """
+
+    _write_file(config_dir + "build_manifest.json",
+                json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def _page_build_key(site, slug):
+
+    """Return hash of everything a static page depends on besides menu and template
+    """
+
+    head, level, page, slugs = site.head, site.level, site.page, site.slugs
+    # 包含頁面的標題, 內容, 層級與前後頁的標題及檔名
+    parts = [slug]
+    for page_order in site.titles.get(slug, []):
+        parts.append(head[page_order])
+        if page_order > 0:
+            parts.append(head[page_order-1] + "\0" + slugs[page_order-1])
+        else:
+            parts.append("")
+        if page_order < len(head) - 1:
+            parts.append(head[page_order+1] + "\0" + slugs[page_order+1])
+        else:
+            parts.append("")
+        parts.append(level[page_order])
+        parts.append(page[page_order])
+    return _content_hash("\0".join(parts))
+
+
+class _TextExtractor(html.parser.HTMLParser):
+
+    """Collect visible text of page contents without building a document tree
+    """
+
+    # 這些標註內的文字不會顯示在頁面上, 註解則由 HTMLParser 另行處理而不會列入
+    hidden = ("style", "script", "head", "title")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.hidden:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.hidden and self.depth:
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if not self.depth:
+            self.text.append(data)
+
+
+def _search_text(page_content_list):
+
+    """Return visible text of page contents for the tipue search index
+    """
+
+    parser = _TextExtractor()
+    parser.feed(" ".join(page_content_list))
+    parser.close()
+    return " ".join(parser.text)
+
+
+def _js_json(value):
+
+    """Return value as JSON that is also valid in a JavaScript source file
+    """
+
+    # U+2028 與 U+2029 在 JSON 字串中合法, 但舊版 JavaScript 視為換行
+    return json.dumps(value, ensure_ascii=False).replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+
+def write_search_index(f, entries):
+
+    """Write tipuesearch_content.js to file object f, one page entry at a time
+    """
+
+    f.write('var tipuesearch = {"pages": [')
+    for index, entry in enumerate(entries):
+        if index:
+            f.write(", ")
+        f.write(_js_json(entry))
+    f.write("]};")
+
+
+def render_static_page(site, index):
+
+    """Return html of static page index of site
+    """
+
+    # 在此必須要將頁面中的 /images/ 字串換為 images/, /downloads/ 換為 downloads/
+    # 因為 Flask 中靠 /images/ 取檔案, 但是一般 html 則採相對目錄取檔案
+    # 此一字串置換在 build_site_model 中進行
+    # 加入 tipue search 模式
+    html_doc = get_page2(site.slugs[index], site.head, 0, site=site)
+    return html_doc.replace('<meta charset="utf-8">', '<meta charset="utf-8">\n<meta property="head" content="H'+str(site.level[index])+'">')
+
+
+def _init_export_worker(site):
+
+    """Keep site model in the export worker process
+    """
+
+    global _export_site
+    _export_site = site
+
+
+def _render_in_worker(index):
+
+    """Render static page index in the export worker process
+    """
+
+    return render_static_page(_export_site, index)
+
+
+def _pool_context():
+
+    """Return multiprocessing context of export workers, None when pages must be rendered serially
+    """
+
+    # 網站伺服器以多個執行緒處理 request, 在其中 fork 的 process 可能卡在其他執行緒持有的 lock
+    # spawn 則會重新執行主程式, 由 wsgi.py 啟動時並沒有 __main__ 判斷, 因此只有命令列轉檔才使用 process pool
+    if __name__ != "__main__":
+        return None
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _render_pages(site, indexes, jobs=None):
+
+    """Yield html of site pages at indexes, in order
+    """
+
+    if jobs is None:
+        jobs = export_jobs
+    if jobs <= 0:
+        # 容器中可用的核心數可能少於 cpu_count()
+        if hasattr(os, "sched_getaffinity"):
+            jobs = len(os.sched_getaffinity(0))
+        else:
+            jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(indexes))
+    done = 0
+    context = _pool_context()
+    if jobs > 1 and context is not None:
+        try:
+            with ProcessPoolExecutor(jobs, context, _init_export_worker, (site,)) as executor:
+                chunksize = max(1, len(indexes) // (jobs * 4))
+                for result in executor.map(_render_in_worker, indexes, chunksize=chunksize):
+                    yield result
+                    done += 1
+        except (OSError, BrokenProcessPool):
+            # 無法建立或維持 process pool 時, 其餘頁面改為逐頁產生
+            pass
+    for index in indexes[done:]:
+        yield render_static_page(site, index)
+
+
+def _lap(timings, phase, start):
+
+    """Record seconds spent in phase when timings is a dict, return the current time
+    """
+
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0) + now - start
+    return now
+
+
+def export_static(site, jobs=None, timings=None):
+
+    """Write static pages of site into content directory, return written, unchanged and removed files and bytes saved by minify
+    """
+
+    start = time.perf_counter()
+    content_dir = _curdir + "/content/"
+    # 先寫入 content.staging, 完成後才與 content 對調, 靜態伺服器不會讀到轉檔一半的網站
+    staging_dir = _curdir + "/content.staging/"
+    if os.path.isdir(staging_dir):
+        # 上次轉檔中斷所留下的目錄
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+    _write_ignore_marker(staging_dir)
+    old_manifest = _load_build_manifest()
+    old_files = old_manifest.get("files", {})
+    # 程式碼或頁首改變時所有頁面都要重新產生, 選單改變亦同
+    suffixes = _compressed_suffixes()
+    assets = {}
+    old_assets = _load_asset_manifest() if fingerprint_assets else {}
+    # 上次引用的檔案內容改變或被刪除時, 所有頁面的 ?v= 都要更新
+    # 頁面新引用的檔案只影響該頁面, 由頁面內容的 key 決定是否重新產生
+    assets_changed = [path for path in sorted(old_assets)
+                      if _asset_hash(path, assets, old_assets) != old_assets[path]["hash"]]
+    with open(os.path.abspath(__file__), "rb") as f:
+        template_hash = _content_hash(f.read().decode("utf-8") + set_css2() + checkMath() + site.nav +
+                                      " ".join(suffixes) + str(fingerprint_assets) + str(minify_html))
+    menu_hash = _content_hash(site.nav + site.menu + site.sitemap_menu)
+    # 共用選單時各頁面只引用 menu.js, 選單改變不影響頁面內容
+    rebuild_all = old_manifest.get("template") != template_hash or len(assets_changed) > 0 or \
+                  (not site.nav_file and old_manifest.get("menu") != menu_hash)
+    files = {}
+    written = []
+    unchanged = []
+    minified = []
+
+    def current(filename, key):
+        # 傳回仍然有效的舊紀錄, 輸出檔被刪除或修改過也視為失效
+        entry = old_files.get(filename)
+        if rebuild_all or entry is None or entry["key"] != key:
+            return None
+        try:
+            stat = os.stat(content_dir + filename)
+        except OSError:
+            return None
+        if [stat.st_size, stat.st_mtime_ns] != entry["stat"]:
+            return None
+        files[filename] = {"key": entry["key"], "stat": entry["stat"]}
+        if "assets" in entry:
+            files[filename]["assets"] = entry["assets"]
+        unchanged.append(filename)
+        return entry
+
+    def write(filename, key, data):
+        # data 為字串或是將內容逐段寫入檔案的函式
+        used = []
+        if fingerprint_assets and filename.endswith(".html"):
+            data = _fingerprint(data, assets, old_assets, used)
+        if minify_html and filename.endswith(".html"):
+            size = len(data.encode("utf-8"))
+            data = minify(data)
+            minified.append((filename, size - len(data.encode("utf-8"))))
+        with open(staging_dir + filename, "w", encoding="utf-8") as f:
+            if callable(data):
+                data(f)
+            else:
+                f.write(data)
+        stat = os.stat(staging_dir + filename)
+        files[filename] = {"key": key, "stat": [stat.st_size, stat.st_mtime_ns]}
+        # 記錄頁面引用的檔案, asset manifest 只保留仍被頁面引用的檔案
+        if used:
+            files[filename]["assets"] = sorted(set(used))
+        written.append(filename)
+
+    head, slugs = site.head, site.slugs
+    # 這裡需要建立專門寫出 html 的 write_page
+    # index.html
+    key = _page_build_key(site, slugs[0])
+    if current("index.html", key) is None:
+        write("index.html", key, get_page2(None, head, 0, site=site))
+    # sitemap
+    if current("sitemap.html", menu_hash) is None:
+        write("sitemap.html", menu_hash, sitemap2(head, site))
+    # 共用選單檔名隨內容改變, 舊的選單檔會依 manifest 刪除
+    if site.nav_file:
+        if current(site.nav_file, menu_hash) is None:
+            write(site.nav_file, menu_hash, _menu_script(site.menu))
+        if current("menu.js", site.nav_file) is None:
+            write("menu.js", site.nav_file, _menu_redirect(site.nav_file))
+    # 以下轉檔, 各頁面以 slugs 作為檔名
+    keys = [_page_build_key(site, slugs[i]) for i in range(len(slugs))]
+    pending = [i for i in range(len(slugs)) if current(slugs[i] + ".html", keys[i]) is None]
+    # generate each page html under content directory
+    # 需要重新產生的頁面可分給多個 process 處理, 結果仍依頁面次序寫出
+    for i, html_doc in zip(pending, _render_pages(site, pending, jobs)):
+        write(slugs[i] + ".html", keys[i], html_doc)
+    start = _lap(timings, "pages", start)
+
+    def search_entries():
+        # 搜尋文字取自 site model 中的頁面內容, 逐頁產生, 寫出後即可釋放
+        for i in range(len(slugs)):
+            text = _search_text([site.page[order] for order in site.titles[slugs[i]]])
+            yield {"title": head[i], "text": text, "tags": "", "url": slugs[i] + ".html"}
+
+    # GENERATE js file
+    # 搜尋索引只與各頁標題及內容有關, 不必先組出整個檔案才能判斷是否改變
+    key = _content_hash("\0".join(head + slugs) + "\0" + "\0".join(keys))
+    if current("tipuesearch_content.js", key) is None:
+        write("tipuesearch_content.js", key, lambda f: write_search_index(f, search_entries()))
+    start = _lap(timings, "search", start)
+    if suffixes:
+        # 只壓縮這次寫出的檔案, 未改變檔案的壓縮檔隨原檔帶入
+        for filename in written:
+            if filename.endswith(compressible_types):
+                compress_file(staging_dir + filename)
+        start = _lap(timings, "compress", start)
+
+    def generated(filename):
+        if old_manifest:
+            return filename in old_files
+        return filename.endswith(".html")
+
+    # 未改變的頁面與使用者自行放入 content 的檔案以 hard link 帶入新版本
+    # 只捨棄上次產生而這次不再產生的檔案, 尚無 manifest 時則比照以往捨棄所有 html 檔案
+    removed = []
+    fresh = set(written)
+    kept = set(unchanged)
+    if os.path.isdir(content_dir):
+        for filename in sorted(os.listdir(content_dir)):
+            if filename in fresh:
+                continue
+            base, suffix = os.path.splitext(filename)
+            if suffix in (".br", ".gz") and generated(base):
+                # 原檔重新產生時已另外壓縮, 原檔不再產生則一併捨棄
+                if base in kept and suffix in suffixes:
+                    _stage_entry(content_dir + filename, staging_dir + filename)
+                elif base not in files:
+                    removed.append(filename)
+                continue
+            if generated(filename) and filename not in files:
+                removed.append(filename)
+                continue
+            _stage_entry(content_dir + filename, staging_dir + filename)
+    _publish(staging_dir, content_dir, _curdir + "/content.previous/")
+    _write_build_manifest({"template": template_hash, "menu": menu_hash, "files": files})
+    if fingerprint_assets:
+        used = set(path for entry in files.values() for path in entry.get("assets", []))
+        _write_asset_manifest({path: assets[path] for path in sorted(used) if assets.get(path) is not None})
+    _lap(timings, "cleanup", start)
+    return written, unchanged, removed, minified
+
+
+def _load_asset_manifest():
+
+    """Return the asset manifest of the last static export, {} if there is none
+    """
+
+    try:
+        with open(config_dir + "asset_manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_asset_manifest(assets):
+
+    """Write content hash and stat of the site files referenced by static pages
+    """
+
+    _write_file(config_dir + "asset_manifest.json",
+                json.dumps(assets, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def _asset_hash(path, assets, old_assets):
+
+    """Return content hash of site file path, None if it does not exist
+    """
+
+    # 同一檔案在一次轉檔中只計算一次, (size, mtime) 未改變時沿用上次的 hash
+    if path in assets:
+        entry = assets[path]
+    else:
+        try:
+            stat = os.stat(os.path.join(_curdir, path))
+        except OSError:
+            stat = None
+        if stat is None or ".." in path.split("/"):
+            entry = None
+        else:
+            old = old_assets.get(path)
+            if old is not None and old["stat"] == [stat.st_size, stat.st_mtime_ns]:
+                entry = old
+            else:
+                with open(os.path.join(_curdir, path), "rb") as f:
+                    entry = {"hash": hashlib.sha1(f.read()).hexdigest()[:10],
+                             "stat": [stat.st_size, stat.st_mtime_ns]}
+        assets[path] = entry
+    if entry is None:
+        return None
+    return entry["hash"]
+
+
+def _fingerprint(html_doc, assets, old_assets, used=None):
+
+    """Add ?v=hash to the cmsimde/static urls of a static page, append the versioned paths to used
+    """
+
+    def versioned(match):
+        version = _asset_hash(match.group(3), assets, old_assets)
+        if version is None:
+            return match.group(0)
+        if used is not None:
+            used.append(match.group(3))
+        return match.group(0) + "?v=" + version
+
+    return _asset_url.sub(versioned, html_doc)
+
+
+def minify(html_doc):
+
+    """Return html_doc without comments and with whitespace runs collapsed
+    """
+
+    def collapse(match):
+        if match.group("keep") is not None:
+            return match.group(0)
+        space = _html_comment.sub("", match.group("space"))
+        if space == "":
+            return ""
+        # 保留換行, 瀏覽器顯示結果與原本相同
+        if "\n" in space:
+            return "\n"
+        return " "
+
+    return _minify_pattern.sub(collapse, html_doc)
+
+
+def asset_version(path):
+
+    """Return content hash of site file path given by the last static export, None if it is unknown or changed since
+    """
+
+    global _asset_cache
+    try:
+        stat = os.stat(config_dir + "asset_manifest.json")
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    if _asset_cache.get("version") != version:
+        _asset_cache = {"version": version, "assets": _load_asset_manifest()}
+    entry = _asset_cache["assets"].get(path)
+    if entry is None:
+        return None
+    # 轉檔後才修改的檔案不可再讓瀏覽器長期快取
+    try:
+        stat = os.stat(os.path.join(_curdir, path))
+    except OSError:
+        return None
+    if [stat.st_size, stat.st_mtime_ns] != entry["stat"]:
+        return None
+    return entry["hash"]
+
+
+def _compressed_suffixes():
+
+    """Return suffixes of the precompressed copies written next to static output
+    """
+
+    if not precompress:
+        return ()
+    return tuple(suffix for suffix, encoding in precompressed_variants
+                 if encoding != "br" or brotli is not None)
+
+
+def compress_file(filename):
+
+    """Write .br and .gz copies next to filename, return the suffixes written
+    """
+
+    with open(filename, "rb") as f:
+        data = f.read()
+    stat = os.stat(filename)
+    written = []
+    for suffix, encoding in precompressed_variants:
+        if encoding == "br":
+            if brotli is None:
+                continue
+            packed = brotli.compress(data)
+        else:
+            # mtime=0 讓相同內容產生相同的壓縮檔
+            packed = gzip.compress(data, 9, mtime=0)
+        if len(packed) >= len(data):
+            # 壓縮後沒有變小的檔案直接送出原檔即可
+            if os.path.exists(filename + suffix):
+                os.remove(filename + suffix)
+            continue
+        with open(filename + suffix, "wb") as f:
+            f.write(packed)
+        # 壓縮檔採用原檔的修改時間, 兩者的 Last-Modified 一致
+        os.utime(filename + suffix, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        written.append(suffix)
+    return written
+
+
+def precompress_tree(directory):
+
+    """Compress html, js, css and json files under directory whose copies are missing or stale, return their number
+    """
+
+    suffixes = [suffix for suffix, encoding in precompressed_variants
+                if encoding != "br" or brotli is not None]
+    count = 0
+    for root, dirs, filenames in os.walk(directory):
+        for filename in filenames:
+            if not filename.endswith(compressible_types):
+                continue
+            path = os.path.join(root, filename)
+            mtime = os.stat(path).st_mtime_ns
+            try:
+                if all(os.stat(path + suffix).st_mtime_ns == mtime for suffix in suffixes):
+                    continue
+            except OSError:
+                pass
+            compress_file(path)
+            count += 1
+    return count
+
+
+def _write_ignore_marker(directory):
+
+    """Keep git from adding a staging or previous build directory
+    """
+
+    # acp 以 git add . 提交整個網站, 這兩個目錄只供轉檔與還原使用
+    if not os.path.exists(directory + ".gitignore"):
+        with open(directory + ".gitignore", "w", encoding="utf-8") as f:
+            f.write(_ignore_marker)
+
+
+def _remove_ignore_marker(directory):
+
+    """Remove .gitignore written by _write_ignore_marker before the directory is published
+    """
+
+    try:
+        if file_get_contents(directory + ".gitignore") == _ignore_marker:
+            os.remove(directory + ".gitignore")
+    except (OSError, UnicodeDecodeError):
+        pass
+
+
+def _link_or_copy(source, target):
+
+    """Hard link source to target, copy it where links are not supported
+    """
+
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    return target
+
+
+def _stage_entry(source, target):
+
+    """Bring an existing file or directory of content into the staging build
+    """
+
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(source, target)
+
+
+def _exchange_dirs(first, second):
+
+    """Atomically exchange two directories, return False where the system can not
+    """
+
+    # Linux 3.15 之後的 renameat2(RENAME_EXCHANGE) 可一次對調兩個目錄
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+    AT_FDCWD = -100
+    RENAME_EXCHANGE = 2
+    return renameat2(AT_FDCWD, os.fsencode(first.rstrip("/")),
+                     AT_FDCWD, os.fsencode(second.rstrip("/")), RENAME_EXCHANGE) == 0
+
+
+def _rename_retry(source, target, attempts=5):
+
+    """Rename source to target, return False if it stays locked by another process
+    """
+
+    for attempt in range(attempts):
+        try:
+            os.rename(source, target)
+            return True
+        except PermissionError:
+            # 其他程序關閉檔案後即可改名
+            time.sleep(0.2)
+    return False
+
+
+def _copy_into(staging_dir, content_dir):
+
+    """Copy the staging build over content directory in place, then remove staging
+    """
+
+    for root, dirs, filenames in os.walk(staging_dir):
+        target_root = os.path.join(content_dir, os.path.relpath(root, staging_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in filenames:
+            source = os.path.join(root, filename)
+            target = os.path.join(target_root, filename)
+            # 未改變的檔案以 hard link 帶入 staging, 與 content 中的檔案相同
+            if os.path.exists(target) and os.path.samefile(source, target):
+                continue
+            # copy2 保留修改時間, 與 build manifest 記錄的 stat 一致
+            shutil.copy2(source, target)
+    # 刪除新版本中沒有的檔案, 仍在開啟中而無法刪除的舊檔案留待下次轉檔
+    for root, dirs, filenames in os.walk(content_dir, topdown=False):
+        staged = os.path.join(staging_dir, os.path.relpath(root, content_dir))
+        for filename in filenames:
+            if not os.path.exists(os.path.join(staged, filename)):
+                try:
+                    os.remove(os.path.join(root, filename))
+                except OSError:
+                    pass
+        if not os.path.isdir(staged):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+    shutil.rmtree(staging_dir)
+
+
+def _publish(staging_dir, content_dir, previous_dir):
+
+    """Swap staging build in as content directory, keep the replaced build as previous
+    """
+
+    _remove_ignore_marker(staging_dir)
+    if not os.path.isdir(content_dir):
+        os.rename(staging_dir, content_dir)
+        return
+    if os.path.isdir(previous_dir):
+        shutil.rmtree(previous_dir)
+    if _exchange_dirs(staging_dir, content_dir):
+        os.rename(staging_dir, previous_dir)
+    else:
+        # 無法一次對調時以兩次 rename 切換, 其間 content 目錄只會短暫不存在
+        if not _rename_retry(content_dir, previous_dir):
+            # Windows 上 content 中有檔案開啟中 (靜態伺服器正在送出頁面, 檔案總管) 時無法改名
+            # 改為將新版本逐一複製到 content 中, 此時不是一次切換, 也不保留 content.previous
+            _copy_into(staging_dir, content_dir)
+            return
+        try:
+            os.rename(staging_dir, content_dir)
+        except OSError:
+            os.rename(previous_dir, content_dir)
+            raise
+    _write_ignore_marker(previous_dir)
+
+
+@contextlib.contextmanager
+def _build_lock():
+
+    """Hold the exclusive static build lock, waiting for a build of another process to finish
+    """
+
+    # 命令列, 排程與 /generate_pages 可能同時轉檔, 共用的 content.staging 與 manifest 只能由一個程序改寫
+    with open(config_dir + "build.lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK 約等待 10 秒後放棄, 因此重複嘗試
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def rollback_static():
+
+    """Swap the previous static build back in, return False if there is none
+    """
+
+    with _build_lock():
+        return _rollback_static()
+
+
+def _rollback_static():
+
+    """Swap the previous static build back in while holding the build lock
+    """
+
+    content_dir = _curdir + "/content/"
+    previous_dir = _curdir + "/content.previous/"
+    if not os.path.isdir(previous_dir):
+        return False
+    staging_dir = _curdir + "/content.staging/"
+    _remove_ignore_marker(previous_dir)
+    if not _exchange_dirs(previous_dir, content_dir):
+        if os.path.isdir(staging_dir):
+            shutil.rmtree(staging_dir)
+        os.rename(content_dir, staging_dir)
+        os.rename(previous_dir, content_dir)
+        os.rename(staging_dir, previous_dir)
+    _write_ignore_marker(previous_dir)
+    # 還原後 manifest 與 content 內容不符, 下次轉檔重新比對所有頁面
+    if os.path.isfile(config_dir + "build_manifest.json"):
+        os.remove(config_dir + "build_manifest.json")
+    return True
+
+
+def build_static(jobs=None, timings=None):
+
+    """Convert content.htm to static html files in content directory, return written, unchanged and removed files, broken links and bytes saved by minify
+    """
+
+    start = time.perf_counter()
+    content = parse_content()
+    if isinstance(content, str):
+        # parse_content 以字串傳回錯誤訊息
+        raise ValueError(content)
+    head, level, page = content
+    start = _lap(timings, "parse", start)
+    # 其他程序轉檔時等待完成, 再依其 manifest 與 slug registry 轉檔
+    with _build_lock():
+        # content.htm 只解析一次, 各頁面, sitemap 與搜尋索引都由同一個 site model 產生
+        # 各頁面的檔名沿用上次轉檔的配置, 重複或含有特殊字元的標題也有固定的網址
+        slugs, registry = assign_slugs(head, page, _load_slug_registry())
+        site = build_site_model(head, level, page, slugs)
+        _lap(timings, "model", start)
+        # 只改寫內容, 前後頁或選單有變動的頁面, 並刪除不再產生的舊檔案
+        # 頁面間的連結已換為目標檔名, 改名時只有連結到該頁的頁面內容隨之改變
+        written, unchanged, removed, minified = export_static(site, jobs, timings)
+        _write_slug_registry(registry)
+    return written, unchanged, removed, list(site.broken), minified
+
+
+def get_page2(heading, head, edit, get_page_content = None, site = None):
+
+    """Get page content and replace certain string for static site
+    """
+
+    # 靜態頁面只有瀏覽模式, edit 保留為相容於先前的呼叫方式, 編輯請使用動態網站的 get_page
+    # 轉檔時由 build_static 傳入 site model, 不再每一頁都重新解析 content.htm
+    if site is None:
+        not_used_head, level, page = parse_content()
+        site = build_site_model(head, level, page)
+    head, level, page, slugs = site.head, site.level, site.page, site.slugs
+    directory = site.nav
+    # heading 為靜態網頁檔名, 重複標題的各頁面有不同的檔名
+    if heading is None:
+        heading = slugs[0]
+    page_order_list = site.titles.get(heading, [])
+    page_content_list = [page[page_order] for page_order in page_order_list]
+    if get_page_content != None:
+        get_page_content.extend(page_content_list)
+    return_content = ""
+    for i in range(len(page_order_list)):
+        page_order = page_order_list[i]
+        if page_order == 0:
+            last_page = ""
+        else:
+            #last_page = head[page_order-1]+ " << <a href='/get_page/" + head[page_order-1] + "'>Previous</a>"
+            last_page = head[page_order-1] + " << <a href='"+slugs[page_order-1] + ".html'>Previous</a>"
+        if page_order == len(head) - 1:
+            # no next page
+            next_page = ""
+        else:
+            #next_page = "<a href='/get_page/"+head[page_order+1] + "'>Next</a> >> " + head[page_order+1]
+            next_page = "<a href='" + slugs[page_order+1] + ".html'>Next</a> >> " + head[page_order+1]
+        if len(page_order_list) > 1:
+            return_content += last_page + " " + next_page + "<br /><h1>" + \
+                                      head[page_order] + "</h1>" + page_content_list[i] + \
+                                      "<br />" + last_page + " "+ next_page + "<br /><hr>"
+        else:
+            return_content += last_page + " " + next_page + "<br /><h1>" + \
+                                      head[page_order] + "</h1>" + page_content_list[i] + \
+                                      "<br />" + last_page + " " + next_page
+
+    return set_css2() + '''<div class='container'><nav>
+        '''+ \
+        directory + "<div id=\"tipue_search_content\">" + return_content + \
+        '''</div>
+        
+    <!-- footer -->
+      <div class="container">
+        <div class="row pt-3 mx-auto">
+            <p>
+            <!-- Link back to Colorlib can't be removed. Template is licensed under CC BY 3.0. -->
+            Copyright &copy;<script>document.write(new Date().getFullYear());</script> All rights reserved | This template is made with <i class="icon-heart" aria-hidden="true"></i> by <a href="https://colorlib.com" target="_blank" >Colorlib</a>
+            <!-- Link back to Colorlib can't be removed. Template is licensed under CC BY 3.0. -->
+            </p>
+        </div>
+      </div>
+    <!-- for footer -->
+    
+        </div> <!-- for site wrap -->
+            <!-- <script src="../cmsimde/static/chimper/js/jquery-3.3.1.min.js"></script> -->
+            <script src="../cmsimde/static/chimper/js/jquery-migrate-3.0.1.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/jquery-ui.js"></script>
+            <script src="../cmsimde/static/chimper/js/popper.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/bootstrap.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/owl.carousel.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/jquery.stellar.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/jquery.countdown.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/jquery.magnific-popup.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/bootstrap-datepicker.min.js"></script>
+            <script src="../cmsimde/static/chimper/js/aos.js"></script>
+            <!--
+            <script src="../cmsimde/static/chimper/js/typed.js"></script>
+                    <script>
+                    var typed = new Typed('.typed-words', {
+                    strings: ["Web Apps"," WordPress"," Mobile Apps"],
+                    typeSpeed: 80,
+                    backSpeed: 80,
+                    backDelay: 4000,
+                    startDelay: 1000,
+                    loop: true,
+                    showCursor: true
+                    });
+                    </script>
+            -->
+            <script src="../cmsimde/static/chimper/js/main.js"></script>
+        ''' + syntaxhighlight_scripts("./../cmsimde/static/", used_brushes(page_content_list)) + \
+        checkMath() + '''</body></html>
+        '''
+
+
+def invalidate_content_cache():
+
+    """Drop the parsed content.htm cache
+    """
+
+    # 存檔動作後呼叫, 避免 mtime 精度不足時仍傳回舊的解析結果或索引
+    with _content_cache_lock:
+        _content_cache.clear()
+
+
+def invalidate_config_cache():
+
+    """Drop the cached settings and page shells after saveConfig
+    """
+
+    _settings_cache.clear()
+    _shell_cache.clear()
+
+
+def parse_config():
+
+    """Parse config
+    """
+
+    settings = load_settings()
+    return settings.site_title, settings.password
+
+
+def _settings_version():
+
+    """Return (mtime, size) of config/sitetitle and config/config, None if one is missing
+    """
+
+    try:
+        title_stat = os.stat(config_dir + "sitetitle")
+        config_stat = os.stat(config_dir + "config")
+    except OSError:
+        return None
+    return (title_stat.st_mtime_ns, title_stat.st_size,
+            config_stat.st_mtime_ns, config_stat.st_size)
+
+
+def load_settings():
+
+    """Return Settings read from config/sitetitle and config/config
+    """
+
+    version = _settings_version()
+    cached = _settings_cache.get("settings")
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+
+    # if there is no config/config automatically generate one with content "admin"
+    if not os.path.isfile(config_dir+"config"):
+        # create config file if there is no config file
+        # default password is admin
+        password = "admin"
+        hashed_password = hashlib.sha512(password.encode('utf-8')).hexdigest()
+        with open(config_dir + "config", "w", encoding="utf-8") as f:
+            f.write(hashed_password)
+
+    # if there is no config/sitetitle automatically generate one with content "cmsimde"
+    if not os.path.isfile(config_dir+"sitetitle"):
+        # default sitetitle is "cmsimde"
+        with open(config_dir + "sitetitle", "w", encoding="utf-8") as f:
+            f.write("cmsimde")
+
+    # 先取得版本再讀取, 若讀取期間檔案被改寫, 下次呼叫會因版本不同而重新讀取
+    version = _settings_version()
+    # read site_title from config/sitetitle
+    site_title = file_get_contents(config_dir + "sitetitle")
+    password = file_get_contents(config_dir + "config")
+    settings = Settings(site_title, password)
+    _settings_cache["settings"] = (version, settings)
+
+    return settings
+
+
+def _normalize_content(subject):
+
+    """Return normalized content.htm source
+    """
+
+    # _remove_h123_attrs() 整理一次後仍可能產生需要再整理的標題, 因此重複至內容不再改變為止
+    while True:
+        # make the soup out of the html content
+        soup = bs4.BeautifulSoup(subject, 'html.parser')
+        # 嘗試解讀各種情況下的標題
+        soup = _remove_h123_attrs(soup)
+        normalized = soup.decode()
+        if normalized == subject:
+            return subject
+        subject = normalized
+
+
+def _normalized_marker():
+
+    """Return content hash recorded when content.htm was last normalized
+    """
+
+    if not os.path.isfile(config_dir + "content_normalized"):
+        return None
+    return file_get_contents(config_dir + "content_normalized")
+
+
+def _remove_h123_attrs(soup):
+
+    """Remove h1-h3 tag attribute
+    """
+
+    tag_order = 0
+    for tag in soup.find_all(['h1', 'h2', 'h3']):
+        # 假如標註內容沒有字串
+        #if len(tag.text) == 0:
+        if len(tag.contents) ==0:
+            # 且該標註為排序第一
+            if tag_order == 0:
+                tag.string = "First"
+            else:
+          # 若該標註非排序第一, 則移除無內容的標題標註
+                tag.extract()
+        # 針對單一元件的標題標註
+        elif len(tag.contents) == 1:
+            # 若內容非為純文字, 表示內容為其他標註物件
+            if tag.get_text() == "":
+                # 且該標註為排序第一
+                if tag_order == 0:
+                    # 在最前方插入標題
+                    tag.insert_before(soup.new_tag('h1', 'First'))
+                else:
+                    # 移除 h1, h2 或 h3 標註, 只留下內容
+                    tag.replaceWithChildren()
+            # 表示單一元件的標題標註, 且標題為單一字串者
+            else:
+                # 判定若其排序第一, 則將 tag.name 為 h2 或 h3 者換為 h1
+                if tag_order == 0 and tag.name != "h1":
+                    tag.name = "h1"
+            # 針對其餘單一字串內容的標註, 則保持原樣
+        # 針對內容一個以上的標題標註
+        #elif len(tag.contents) > 1:
+        else:
+            # 假如該標註內容長度大於 1
+            # 且該標註為排序第一
+            if tag_order == 0:
+                # 先移除 h1, h2 或 h3 標註, 只留下內容
+                #tag.replaceWithChildren()
+                # 在最前方插入標題
+                tag.insert_before(soup.new_tag('h1', 'First'))
+            else:
+                # 只保留標題內容,  去除 h1, h2 或 h3 標註
+                # 為了與前面的內文區隔, 先在最前面插入 br 標註
+                tag.insert_before(soup.new_tag('br'))
+                # 再移除非排序第一的 h1, h2 或 h3 標註, 只留下內容
+                tag.replaceWithChildren()
+        tag_order = tag_order + 1
+
+    return soup
+
+
+class _HeadingSplitter(html.parser.HTMLParser):
+
+    """Record h1-h3 offsets of content.htm in a single pass
+    """
+
+    def __init__(self, subject):
+        super().__init__(convert_charrefs=True)
+        self.subject = subject
+        # 各行起始位置, 用來將 getpos() 傳回的 (行, 欄) 換算為字元位置
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", subject)]
+        # 每個標題為 [起始位置, 結束位置, 層級, 標題文字]
+        self.headings = []
+        # 尚未結束的標題, 標題內的文字都要加入各層標題
+        self.open_headings = []
+        self.feed(subject)
+        self.close()
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("h1", "h2", "h3"):
+            start = self._offset()
+            heading = [start, start + len(self.get_starttag_text()), tag[1], ""]
+            self.headings.append(heading)
+            self.open_headings.append(heading)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in ("h1", "h2", "h3"):
+            start = self._offset()
+            self.headings.append([start, start + len(self.get_starttag_text()), tag[1], ""])
+
+    def handle_endtag(self, tag):
+        if tag not in ("h1", "h2", "h3"):
+            return
+        # 由內而外找出對應的標題, 結束位置為結束標註的 > 之後
+        for index in range(len(self.open_headings) - 1, -1, -1):
+            heading = self.open_headings[index]
+            if heading[2] == tag[1]:
+                heading[1] = self.subject.index(">", self._offset()) + 1
+                del self.open_headings[index:]
+                break
+
+    def handle_data(self, data):
+        for heading in self.open_headings:
+            heading[3] += data
+
+
+def _find_headings_bs4(subject, features):
+
+    """Return h1-h3 offsets of content.htm using a BeautifulSoup tree
+    """
+
+    headings = []
+    soup = bs4.BeautifulSoup(subject, features)
+    if features == "html.parser":
+        # html.parser 會記錄各標註的 sourceline 與 sourcepos
+        line_starts = [0] + [m.end() for m in re.finditer("\n", subject)]
+        for tag in soup.find_all(['h1', 'h2', 'h3']):
+            start = line_starts[tag.sourceline - 1] + tag.sourcepos
+            headings.append([start, start + len(str(tag)), tag.name[1], tag.text])
+    else:
+        # lxml 沒有原始位置資料, 由上一個標題之後往後搜尋標題的原始字串
+        position = 0
+        for tag in soup.find_all(['h1', 'h2', 'h3']):
+            start = subject.find(str(tag), position)
+            if start < 0:
+                # lxml 改寫了標題 (例如將 <h2><p>x</p></h2> 拆為空的 h2), 略過會讓該頁併入前一頁
+                # 無法對應原始位置時, 整份內容改以 stream 切割
+                return _HeadingSplitter(subject).headings
+            position = start + len(str(tag))
+            headings.append([start, position, tag.name[1], tag.text])
+    return headings
+
+
+def _find_headings(subject, backend=None):
+
+    """Return [start, end, level, title] of each h1-h3 in content.htm source
+    """
+
+    # "stream" 只逐一掃描標註不建立 DOM, 其餘則以 bs4 建立完整的文件樹
+    if backend is None:
+        backend = content_parser
+    if backend == "stream":
+        return _HeadingSplitter(subject).headings
+    return _find_headings_bs4(subject, backend)
+
+
+def _split_content(subject, backend=None):
+
+    """Split content.htm source into head, level and page lists
+    """
+
+    # 只掃描一次 content.htm, 各頁面內容直接以標題位置切片取得, 不再逐一 split 剩餘字串
+    headings = _find_headings(subject, backend)
+    if len(headings) == 0:
+        return "Error: no heading in content.htm"
+    head_list = []
+    level_list = []
+    page_list = []
+    for index in range(len(headings)):
+        start, end, level, title = headings[index]
+        if index < len(headings) - 1:
+            next_start = headings[index + 1][0]
+        else:
+            next_start = len(subject)
+        head_list.append(title.strip())
+        # 標題層級 h1, h2 或 h3 取數字字串, 作為選單層級
+        level_list.append(level)
+        page_list.append(subject[end:next_start])
+    return head_list, level_list, page_list
+
+
+def _content_hash(subject):
+
+    """Return hash of content.htm source
+    """
+
+    return hashlib.sha1(subject.encode("utf-8")).hexdigest()
+
+
+def _content_version():
+
+    """Return (mtime, size, inode) of content source as cache key
+    """
+
+    # 分頁儲存模式以 pages/manifest.json 作為版本依據
+    if storage == "pages":
+        stat = os.stat(pages_dir + "manifest.json")
+    else:
+        stat = os.stat(config_dir + "content.htm")
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _has_content():
+
+    """Return True when there is content to parse in the configured storage
+    """
+
+    # 分頁儲存模式第一次使用時由 content.htm 匯入, 兩者皆無則沒有內容
+    if storage == "pages" and os.path.isfile(pages_dir + "manifest.json"):
+        return True
+    return os.path.isfile(config_dir + "content.htm")
+
+
+def parse_content():
+
+    """Return cached head, level and page lists of content.htm
+    """
+
+    # content.htm 版本未變時直接傳回快取的 head, level, page 數列, 不再重新解析
+    # 呼叫端只讀取這些數列, 不得直接修改其內容
+    if not _has_content():
+        return "Error: no content.htm"
+    if storage == "pages":
+        _load_manifest()
+    cached = _content_cache.get("content")
+    if cached is not None and cached[0] == _content_version():
+        return cached[1]
+    with _content_cache_lock:
+        # 等待鎖定期間, 其他執行緒可能已經完成解析
+        cached = _content_cache.get("content")
+        if cached is not None and cached[0] == _content_version():
+            return cached[1]
+        # 讀取前先取版本, 解析期間若有存檔, 下次呼叫時版本不同即會重新解析
+        version = _content_version()
+        result = _parse_content_file()
+        # 錯誤訊息字串不列入快取
+        if isinstance(result, tuple):
+            _content_cache["content"] = (version, result)
+    return result
+
+
+def _parse_content_file():
+
+    """Use bs4 and re module functions to parse content.htm
+    """
+
+    if storage == "pages":
+        return _parse_pages()
+    #from pybean import Store, SQLiteWriter
+    # if no content.db, create database file with cms table
+    '''
+    if not os.path.isfile(config_dir+"content.db"):
+        library = Store(SQLiteWriter(config_dir+"content.db", frozen=False))
+        cms = library.new("cms")
+        cms.follow = 0
+        cms.title = "head 1"
+        cms.content = "content 1"
+        cms.memo = "first memo"
+        library.save(cms)
+        library.commit()
+    '''
+    # if no content.htm, generate a head 1 and content 1 file
+    if not os.path.isfile(config_dir+"content.htm"):
+        return "Error: no content.htm"
+        '''
+        # create content.htm if there is no content.htm
+        with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
+            f.write("<h1>head 1</h1>content 1")
+        '''
+    subject = file_get_contents(config_dir+"content.htm")
+    # deal with content without content
+    if subject == "":
+        return "Error: no data in content.htm"
+        '''
+        # create content.htm if there is no content.htm
+        with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
+            f.write("<h1>head 1</h1>content 1")
+        subject = "<h1>head 1</h1>content 1"
+        '''
+    # 存檔時已經整理過標題的 content.htm 直接切割, 否則只在記憶體中整理, 讀取時不再改寫 content.htm
+    if _content_hash(subject) != _normalized_marker():
+        subject = _normalize_content(subject)
+    return _split_content(subject)
+
+
+def _build_section_index(subject):
+
+    """Return section entries of normalized content.htm with byte offsets
+    """
+
+    # 位置改以 utf-8 位元組計算, 讓 read_pages 可以直接從 mmap 切出頁面內容
+    sections = []
+    position = 0
+    byte_position = 0
+
+    def byte_offset(offset):
+        nonlocal position, byte_position
+        if offset < position:
+            return len(subject[:offset].encode("utf-8"))
+        byte_position += len(subject[position:offset].encode("utf-8"))
+        position = offset
+        return byte_position
+
+    headings = _find_headings(subject)
+    for index in range(len(headings)):
+        start, end, level, title = headings[index]
+        if index < len(headings) - 1:
+            next_start = headings[index + 1][0]
+        else:
+            next_start = len(subject)
+        sections.append({
+            "title": title.strip(),
+            "level": level,
+            "start": byte_offset(end),
+            "end": byte_offset(next_start),
+            "hash": _content_hash(subject[end:next_start])
+        })
+    return sections
+
+
+def load_section_index():
+
+    """Return section index of content.htm, rebuild content.idx when outdated
+    """
+
+    # content.idx 與 content.htm 放在一起, 多個行程與重新啟動的 worker 共用同一個索引
+    # 只有存檔後標題已整理的 content.htm 才能建立索引, 否則傳回 None 由 parse_content 處理
+    # 分頁儲存模式由 pages/manifest.json 提供標題, 不需要 content.idx
+    if storage == "pages" or not os.path.isfile(config_dir + "content.htm"):
+        return None
+    version = _content_version()
+    cached = _content_cache.get("index")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    index = None
+    if os.path.isfile(config_dir + "content.idx"):
+        try:
+            with open(config_dir + "content.idx", encoding="utf-8") as f:
+                index = json.load(f)
+        except ValueError:
+            index = None
+    if index is None or index["mtime"] != version[0] or index["size"] != version[1]:
+        with open(config_dir + "content.htm", "rb") as f:
+            raw = f.read()
+        subject = raw.decode("utf-8")
+        # Windows 換行或尚未整理標題的內容, 檔案位置與解析內容不一致, 不建立索引
+        # 同一版本的 content.htm 只檢查一次, 之後直接由 parse_content 處理
+        if b"\r" in raw or subject == "" or _content_hash(subject) != _normalized_marker():
+            _content_cache["index"] = (version, None)
+            return None
+        if index is None or index["hash"] != _content_hash(subject):
+            index = {"hash": _content_hash(subject), "sections": _build_section_index(subject)}
+            if len(index["sections"]) == 0:
+                _content_cache["index"] = (version, None)
+                return None
+        # 內容未變時只更新檔案時間與大小
+        index["mtime"] = version[0]
+        index["size"] = version[1]
+        # 多個 worker 可能同時重建索引, 各自寫入不同的暫存檔再取代
+        _write_file(config_dir + "content.idx", json.dumps(index, ensure_ascii=False).encode("utf-8"))
+    _content_cache["index"] = (version, index)
+    return index
+
+
+def parse_outline():
+
+    """Return head and level lists without reading page content
+    """
+
+    if storage == "pages" and _has_content():
+        source = _load_manifest()["pages"]
+    else:
+        index = load_section_index()
+        if index is None:
+            content = parse_content()
+            # parse_content 以字串傳回錯誤訊息
+            if isinstance(content, str):
+                return content
+            return content[0], content[1]
+        source = index["sections"]
+    # 同一版本的索引重複使用同一組數列, 讓 title_index() 的結果可以沿用
+    cached = _content_cache.get("outline")
+    if cached is not None and cached[0] is source:
+        return cached[1]
+    outline = ([entry["title"] for entry in source], [entry["level"] for entry in source])
+    _content_cache["outline"] = (source, outline)
+    return outline
+
+
+def read_pages(page_order_list):
+
+    """Return page content of the given page orders
+    """
+
+    if storage == "pages":
+        pages = _load_manifest()["pages"]
+        return [_read_shard(pages[order]["id"])[pages[order]["body"]:] for order in page_order_list]
+    # 有索引時以 mmap 只切出需要的頁面, 不必解析整個 content.htm
+    index = load_section_index()
+    if index is not None and index["size"] > 0:
+        with open(config_dir + "content.htm", "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                # 取得索引後檔案若又被改寫, 改由 parse_content 重新解析
+                if content.size() == index["size"]:
+                    return [content[index["sections"][order]["start"]:index["sections"][order]["end"]].decode("utf-8")
+                               for order in page_order_list]
+    head, level, page = parse_content()
+    return [page[order] for order in page_order_list]
+
+
+def _load_manifest():
+
+    """Return page order manifest of pages storage
+    """
+
+    if not os.path.isfile(pages_dir + "manifest.json"):
+        # 第一次啟用分頁儲存時, 由 content.htm 匯入各頁面
+        import_pages(_normalize_content(file_get_contents(config_dir + "content.htm")))
+    version = _content_version()
+    cached = _content_cache.get("manifest")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(pages_dir + "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    _content_cache["manifest"] = (version, manifest)
+    return manifest
+
+
+def _write_manifest(manifest):
+
+    """Write page order manifest of pages storage
+    """
+
+    # 先寫入暫存檔再取代, 避免讀到寫到一半的 manifest
+    _write_file(pages_dir + "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+    invalidate_content_cache()
+
+
+def _read_shard(page_id):
+
+    """Return source of a page file, heading included
+    """
+
+    return file_get_contents(pages_dir + str(page_id) + ".htm")
+
+
+def _write_shard(page_id, source):
+
+    """Write source of a page file
+    """
+
+    with open(pages_dir + str(page_id) + ".htm", "wb") as f:
+        f.write(source.encode("utf-8"))
+
+
+def _shard_entries(fragment, first_id, next_id, keep_lead):
+
+    """Write page files of a normalized fragment and return manifest entries
+    """
+
+    # 第一個標題沿用原頁面編號, 其餘標題配置新編號
+    entries = []
+    headings = _find_headings(fragment)
+    for index in range(len(headings)):
+        start, end, level, title = headings[index]
+        if index == 0:
+            page_id = first_id
+            # 第一個標題前的內容若要保留, 一併存在第一頁檔案中
+            if keep_lead:
+                start = 0
+        else:
+            page_id = next_id
+            next_id += 1
+        if index < len(headings) - 1:
+            next_start = headings[index + 1][0]
+        else:
+            next_start = len(fragment)
+        _write_shard(page_id, fragment[start:next_start])
+        entries.append({"id": page_id, "title": title.strip(), "level": level, "body": end - start})
+    return entries, next_id
+
+
+def _parse_pages():
+
+    """Return head, level and page lists from page files
+    """
+
+    pages = _load_manifest()["pages"]
+    if len(pages) == 0:
+        return "Error: no heading in content.htm"
+    head_list = [entry["title"] for entry in pages]
+    level_list = [entry["level"] for entry in pages]
+    page_list = [_read_shard(entry["id"])[entry["body"]:] for entry in pages]
+    return head_list, level_list, page_list
+
+
+def export_content():
+
+    """Write content.htm from page files when pages storage has newer edits
+    """
+
+    # 分頁儲存模式平時只改寫單一頁面檔案, 需要完整 content.htm 時才重新組合
+    if storage != "pages":
+        return
+    manifest = _load_manifest()
+    if os.path.isfile(config_dir + "content.htm") and \
+            os.stat(config_dir + "content.htm").st_mtime_ns >= os.stat(pages_dir + "manifest.json").st_mtime_ns:
+        return
+    _write_normalized("".join(_read_shard(entry["id"]) for entry in manifest["pages"]))
+
+
+def import_pages(subject):
+
+    """Replace page files with the pages of normalized content.htm source
+    """
+
+    if not os.path.isdir(pages_dir):
+        os.makedirs(pages_dir)
+    entries, next_id = _shard_entries(subject, 1, 2, True)
+    # 移除已經不在 manifest 中的頁面檔案, 以及舊版 save_page 留下的 .bak 備份
+    page_files = [str(entry["id"]) + ".htm" for entry in entries]
+    for filename in os.listdir(pages_dir):
+        if filename.endswith((".htm", ".bak")) and filename not in page_files:
+            os.remove(pages_dir + filename)
+    _write_manifest({"next_id": next_id, "pages": entries})
+
+
+def save_page(page_order, page_content):
+
+    """Save a single page into pages storage
+    """
+
+    # 只改寫該頁 (以及新增標題產生的頁面) 檔案與 manifest, 存檔成本與頁面大小成正比
+    manifest = _load_manifest()
+    pages = manifest["pages"]
+    page_id = pages[page_order]["id"]
+    page_content = extract_data_images(_unix_newlines(page_content))[0]
+    if page_order == 0:
+        fragment = _normalize_content(page_content)
+    else:
+        # 非第一頁時先補上第一個標題, 讓 _remove_h123_attrs 依照在 content.htm 中的位置整理標題
+        fragment = _normalize_content("<h1>First</h1>" + page_content)[len("<h1>First</h1>"):]
+    # 在改寫頁面檔案前, 如同 content_backup.htm 只保留最後一次修改前的頁面
+    shutil.copy2(pages_dir + str(page_id) + ".htm", config_dir + "page_backup.htm")
+    entries, next_id = _shard_entries(fragment, page_id, manifest["next_id"], page_order == 0)
+    headings = _find_headings(fragment)
+    lead = fragment[:headings[0][0]] if len(headings) > 0 else fragment
+    # 第一個標題之前的內容, 在 content.htm 中屬於前一頁
+    if page_order > 0 and lead != "":
+        previous_id = pages[page_order - 1]["id"]
+        _write_shard(previous_id, _read_shard(previous_id) + lead)
+    if len(entries) == 0:
+        os.remove(pages_dir + str(page_id) + ".htm")
+    _write_manifest({"next_id": next_id, "pages": pages[:page_order] + entries + pages[page_order + 1:]})
+
+
+def _cached_menu(flavour, head, level, sitemap, build, *args):
+
+    """Return a rendered menu fragment, building it only when head or level changed
+    """
+
+    # 選單只與標題, 層級及 flavour 有關, 內容未改變前各頁面可共用同一個選單字串
+    key = ("menu", flavour, sitemap)
+    cached = _content_cache.get(key)
+    if cached is not None and cached[0] == tuple(head) and \
+            cached[1] == tuple(level) and cached[2] == args:
+        return cached[3]
+    directory = build(head, level, sitemap, *args)
+    # 保留 head 與 level 的複本, 避免呼叫端之後修改數列而誤用舊選單
+    _content_cache[key] = (tuple(head), tuple(level), args, directory)
+    return directory
+
+
+def render_menu(head, level, page, sitemap=0):
+    
+    """允許使用者在 h1 標題後直接加上 h3 標題, 或者隨後納入 h4 之後作為標題標註
+    """
+
+    return _cached_menu("dynamic", head, level, sitemap, _build_menu)
+
+
+def _build_menu(head, level, sitemap):
+
+    """Build the nested menu or sitemap list for dynamic site
+    """
+
+    directory = []
+    # 從 level 數列第一個元素作為開端
+    current_level = level[0]
+    # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
+    if sitemap:
+        directory.append("<ul>")
+    else:
+        directory.append("<ul id='css3menu1' class='topmenu'>")
+    # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
+    for index in range(len(head)):
+        # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
+        this_level = level[index]
+        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
+        if (int(this_level) - int(current_level)) > 1:
+            #this_level = str(int(this_level) - 1)
+            # 考慮若納入 h4 也作為標題標註, 相鄰層級可能大於一層, 因此直接用上一層級 + 1
+            this_level = str(int(current_level) + 1)
+        # 若處理的階次比目前已經處理的階次大, 表示位階較低
+        # 其實當 level[0] 完全不會報告此一區塊
+        # 從正在處理的標題階次與前一個元素比對, 若階次低, 則要加入另一區段的 unordered list 標頭
+        # 兩者皆為 str 會轉為整數後比較
+        if this_level > current_level:
+            directory.append("<ul>")
+            directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+        # 假如正在處理的標題與前一個元素同位階, 則必須再判定是否為另一個 h1 的樹狀頭
+        elif this_level == current_level:
+            # 若正在處理的標題確實為樹狀頭, 則標上樹狀頭開始標註
+            if this_level == 1:
+                # 這裡還是需要判定是在建立 sitemap 模式或者選單模式
+                if sitemap:
+                    directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index]+"</a>")
+                else:
+                    directory.append("<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+            #  假如不是樹狀頭, 則只列出對應的 list
+            else:
+                directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+        # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
+        else:
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
+            if this_level == 1:
+                if sitemap:
+                    directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+                else:
+                    directory.append("<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+            else:
+                directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
+        current_level = this_level
+    directory.append("</li></ul>")
+    return "".join(directory)
+
+
+def render_menu2(head, level, page, sitemap=0, slugs=None):
+
+    """Render menu for static site
+    """
+
+    # slugs 為各頁面的靜態網頁檔名, 未指定時以標題作為檔名
+    site_title = load_settings().site_title
+    return _cached_menu("static", head, level, sitemap, _build_menu2, site_title,
+                        tuple(head if slugs is None else slugs))
+
+
+def _static_menu_item(head, level, index, this_level, slugs):
+
+    """List item of static menu, marked has-children when the next heading is deeper
+    """
+
+    # 是否加上 class=has-children, 視下一個而定
+    # 目前處理的標題, 並不是最後一個, 因此有下一個標題待處理
+    if index < (len(head)-1):
+        next_level = level[index+1]
+        if this_level < next_level:
+            # 表示要加上 class=dropdown
+            return "<li class='has-children'><a href='" + slugs[index] + ".html'>" + head[index] + "</a>"
+    #表示為最後一個或下一個標題不在此標題之下
+    return "<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>"
+
+
+def _build_menu2(head, level, sitemap, site_title, slugs):
+
+    """Build the navigation header for static site
+    """
+
+    directory = ['''
+    <div class="site-wrap">
+
+    <div class="site-mobile-menu">
+      <div class="site-mobile-menu-header">
+        <div class="site-mobile-menu-close mt-3">
+          <span class="icon-close2 js-menu-toggle"></span>
+        </div>
+      </div>
+      <div class="site-mobile-menu-body"></div>
+    </div>
+    
+            <header class="site-navbar py-4 bg-white" role="banner">
+              <div class="container">
+                <div class="row align-items-center">
+                <h1>''', site_title, '''</h1>
+                <div class="pl-4">
+                    <form>
+                    <input type="text" placeholder="Search" name="q" id="tipue_search_input" pattern=".{2,}" title="At least 2 characters" required>
+                    </form>
+                </div>
+                  <!-- <div class="col-11 col-xl-2">
+                    <h1 class="mb-0 site-logo"><a href="index.html" class="text-black h2 mb-0">''', site_title, '''</a></h1> 
+                  </div>
+                  -->
+                  <div class="col-12 col-md-10 d-none d-xl-block">
+                    <nav class="site-navigation position-relative text-right" role="navigation">
+    ''']
+    
+    # 從 level 數列第一個元素作為開端, 第一個一定非 level 1 不可
+    current_level = level[0]
+    # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
+    if sitemap:
+        directory.append('''<ul>
+<li>
+<form>
+<div class="tipue_search_group">
+<input type="text" name="q" id="tipue_search_input" pattern=".{2,}" title="At least 2 characters" required><button type="submit" class="tipue_search_button"><div class="tipue_search_icon">&#9906;</div></button>
+</div>
+</form>
+</li>
+        ''')
+    else:
+        directory.append('''<ul class='site-menu js-clone-nav mr-auto d-none d-lg-block'>''')
+    # 納入主頁與表單
+    directory.append('''
+                        <li class="active has-children"><a href="index.html">Home</a>
+                        <ul class="dropdown">
+                            <li><a href="sitemap.html">SMap</a></li>
+                            <li><a href="./../reveal/index.html">reveal</a></li>
+                            <li><a href="./../blog/index.html">blog</a></li>
+                        </ul>
+                      </li>
+                     ''')
+    # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
+    for index in range(len(head)):
+        # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
+        this_level = level[index]
+        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
+        if (int(this_level) - int(current_level)) > 1:
+            #this_level = str(int(this_level) - 1)
+            # 考慮若納入 h4 也作為標題標註, 相鄰層級可能大於一層, 因此直接用上一層級 + 1
+            this_level = str(int(current_level) + 1)
+        # 若處理的階次比目前已經處理的階次大, 表示位階較低
+        # 其實當 level[0] 完全不會報告此一區塊
+        # 從正在處理的標題階次與前一個元素比對, 若階次低, 則要加入另一區段的 unordered list 標頭
+        # 兩者皆為 str 會轉為整數後比較
+        # 目前的位階在上一個標題之後
+        if this_level > current_level:
+            directory.append("<ul class='dropdown'>")
+        # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
+        elif this_level < current_level:
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
+        directory.append(_static_menu_item(head, level, index, this_level, slugs))
+        current_level = this_level
+    directory.append('''</li>
+                      </ul>
+                </nav>
+              </div>
+              <div class="d-inline-block d-xl-none ml-md-0 mr-auto py-3" style="position: relative; top: 3px;"><a href="#" class="site-menu-toggle js-menu-toggle text-black"><span class="icon-menu h3"></span></a></div>
+              </div>
+
+            </div>
+          </div>
+          
+        </header>
+    ''')
+    return "".join(directory)
+
+
+def render_menu3(head, level, page, sitemap=0, slugs=None):
+
+    """Render menu for static sitemap
+    """
+
+    return _cached_menu("sitemap", head, level, sitemap, _build_menu3,
+                        tuple(head if slugs is None else slugs))
+
+
+def _build_menu3(head, level, sitemap, slugs):
+
+    """Build the nested menu or sitemap list for static sitemap
+    """
+
+    directory = []
+    current_level = level[0]
+    if sitemap:
+        directory.append("<ul>")
+    else:
+        # before add tipue search function
+        #directory += "<ul id='css3menu1' class='topmenu'>"
+        directory.append("<ul id='css3menu1' class='topmenu'><div class=\"tipue_search_group\"><input style=\"width: 6vw;\" type=\"text\" name=\"q\" id=\"tipue_search_input\" pattern=\".{2,}\" title=\"Press enter key to search\" required></div>")
+    for index in range(len(head)):
+        this_level = level[index]
+        # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
+        if (int(this_level) - int(current_level)) > 1:
+            #this_level = str(int(this_level) - 1)
+            this_level = str(int(current_level) + 1)
+        if this_level > current_level:
+            directory.append("<ul>")
+            #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+            # 改為連結到 content/標題.html
+            directory.append("<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+        elif this_level == current_level:
+            if this_level == 1:
+                if sitemap:
+                    # 改為連結到 content/標題.html
+                    #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                    directory.append("<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+                else:
+                    #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                    directory.append("<li class='topmenu'><a href='content/" + slugs[index] + ".html'>" + head[index] + "</a>")
+            else:
+                #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                directory.append("<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+        else:
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
+            if this_level == 1:
+                if sitemap:
+                    #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                    directory.append("<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+                else:
+                    #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                    directory.append("<li class='topmenu'><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+            else:
+                #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
+                directory.append("<li><a href='" + slugs[index] + ".html'>" + head[index] + "</a>")
+        current_level = this_level
+    directory.append("</li></ul>")
+    return "".join(directory)
+
+
+def shell_parts(mode, admin, build):
+
+    """Return the page head and menu shell of mode, split where the request url belongs
+    """
+
+    site_title = load_settings().site_title
+    key = (mode, site_title, admin)
+    parts = _shell_cache.get(key)
+    if parts is None:
+        # correct_url() 隨請求而異, 先以 \0 標記其位置, 每次請求只需將網址接回
+        parts = build(site_title, admin, "\0").split("\0")
+        _shell_cache[key] = parts
+    return parts
+
+
+def set_css2():
+
+    """Set css for static site
+    """
+
+    return shell_parts("static", False, _build_css2)[0]
+
+
+def _build_css2(site_title, admin, edit_url):
+
+    """Build the head shell for static site
+    """
+
+    static_head = '''
+        <head>
+        <title>''' + init.Init.site_title + '''</title>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/icomoon/style.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap.min.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/magnific-popup.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/jquery-ui.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.carousel.min.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.theme.default.min.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap-datepicker.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/flaticon/font/flaticon.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/aos.css">
+        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/style.css">
+        <link rel="shortcut icon" href="./../cmsimde/static/favicons.png">
+        
+        <style type='text/css'>
+            .site-section {
+            background-color: #FFFF;
+            padding: 40px 40px;
+            }
+            body > div > div.dropdown.open {
+                display: block;
+            }
+        </style>
+    '''
+    outstring = '''<!DOCTYPE html><html>''' + static_head + '''
+        <!-- <script src="./../cmsimde/static/jquery.js"></script> -->
+        <!-- <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.3.1/jquery.min.js"></script> -->
+        <script src="../cmsimde/static/chimper/js/jquery-3.3.1.min.js"></script>
+        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/normalize.min.css">
+        <script src="./../cmsimde/static/tipuesearch/tipuesearch_set.js"></script>
+        <script src="tipuesearch_content.js"></script>
+        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/tipuesearch.css">
+        <script src="./../cmsimde/static/tipuesearch/tipuesearch.js"></script>
+        <!-- for Wink3 客製化關閉 -->
+        <!--
+        <link rel="stylesheet" type="text/css" href="./../cmsimde/static/winkPlayer.css" />
+        <script type="text/javascript" src="./../cmsimde/static/winkPlayer.js"></script>
+        -->
+        <script>
+            /* original tipuesearch
+            $(document).ready(function() {
+                 $('#tipue_search_input').tipuesearch();
+            });
+            */
+            // customed doSearch
+            function doSearch() {
+                $('#tipue_search_input').tipuesearch({
+                    newWindow: true, 
+                    minimumLength: 2,
+                    wholeWords: false, // for search 中文
+                });
+            }
+            $(document).ready(doSearch);
+        </script>
+        ''' + syntaxhighlight2()
+
+    if uwsgi:
+        outstring += '''
+<script type="text/javascript">
+if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -1)) \
+window.location= 'https://' + location.host + location.pathname + location.search;
+</script></head><body>
+'''
+    else:
+        outstring += '''
+</head>
+<body>
+'''
+    return outstring
+
+
+def sitemap2(head, site = None):
+
+    """Sitemap for static content generation
+    """
+
+    edit = 0
+    if site is None:
+        not_used_head, level, page = parse_content()
+        site = build_site_model(head, level, page)
+    directory = site.nav
+    # 先改為使用 render_menu3 而非 render_menu2
+    sitemap = site.sitemap_menu
+    # add tipue search id
+    return set_css2() + "<div class='container'><nav>" + directory + \
+             "</nav><section><h1>SMap</h1><div id=\"tipue_search_content\"></div>" + sitemap + \
+             "</section></div></body></html>"
+
+
+def syntaxhighlight2():
+
+    """Return syntaxhighlight for static pages
+    """
+
+    # SyntaxHighlighter 的 script 依各頁面所用的 brush 由 syntaxhighlight_scripts 加入
+    return '''
+<!-- 暫時不用
+<script src="./../cmsimde/static/fengari-web.js"></script>
+<script type="text/javascript" src="./../cmsimde/static/Cango-13v08-min.js"></script>
+<script type="text/javascript" src="./../cmsimde/static/CangoAxes-4v01-min.js"></script>
+<script type="text/javascript" src="./../cmsimde/static/gearUtils-05.js"></script>
+-->
+<!-- for Brython 暫時不用
+<script src="https://scrum-3.github.io/web/brython/brython.js"></script>
+<script src="https://scrum-3.github.io/web/brython/brython_stdlib.js"></script>
+-->
+<style>
+img.add_border {
+    border: 3px solid blue;
+}
+</style>
+'''
+
+
+def used_brushes(page_content_list):
+
+    """Return SyntaxHighlighter brush files needed by page contents, in load order
+    """
+
+    aliases = set()
+    for page_content in page_content_list:
+        if "brush" in page_content:
+            aliases.update(_brush_alias.findall(page_content))
+    return [filename for filename, names in _brush_files if aliases.intersection(names)]
+
+
+def syntaxhighlight_scripts(static_url, brushes):
+
+    """Return SyntaxHighlighter scripts loading only brushes, empty for a page without code
+    """
+
+    if not brushes:
+        return ""
+    scripts = ['\n<script type="text/javascript" src="' + static_url + 'syntaxhighlighter/shCore.js"></script>\n']
+    for filename in brushes:
+        scripts.append('<script type="text/javascript" src="' + static_url + 'syntaxhighlighter/' + filename + '"></script>\n')
+    scripts.append('<link type="text/css" rel="stylesheet" href="' + static_url + 'syntaxhighlighter/css/shCoreDefault.css"/>\n')
+    scripts.append('<script type="text/javascript">SyntaxHighlighter.all();</script>\n')
+    return "".join(scripts)
+
+
+def title_index(head):
+
+    """Return mapping of title to page orders for head list
+    """
+
+    # 重複標題對應多個頁面次序, 同一個 head 數列只建立一次, 查詢時不必逐一比對標題
+    cached = _content_cache.get("titles")
+    if cached is not None and cached[0] is head:
+        return cached[1]
+    titles = {}
+    for order in range(len(head)):
+        titles.setdefault(head[order], []).append(order)
+    _content_cache["titles"] = (head, titles)
+    return titles
+
+
+def extract_data_images(subject):
+
+    """Write data URI images as files under images, return subject and the image file names
+    """
+
+    # 沒有 data URI 圖片時不必掃描整個內容
+    if "data:image/" not in subject:
+        return subject, []
+    images = []
+
+    def extract(match):
+        extension = _image_types.get(match.group("type").lower())
+        if extension is None:
+            return match.group(0)
+        try:
+            data = base64.b64decode(re.sub(r"\s", "", match.group("data")), validate=True)
+        except (binascii.Error, ValueError):
+            return match.group(0)
+        # 以圖檔內容的 hash 命名, 同一張圖片重複貼上或再次存檔都只有一個檔案
+        filename = hashlib.sha1(data).hexdigest() + extension
+        if not os.path.isfile(image_dir + filename):
+            if not os.path.isdir(image_dir):
+                os.makedirs(image_dir)
+            _write_file(image_dir + filename, data)
+        images.append(filename)
+        # 統一使用雙引號, 轉檔時才會換為 ./../images/
+        return 'src="/images/' + filename + '"'
+
+    return _data_image.sub(extract, subject), images
+
+
+def extract_content_images():
+
+    """Move data URI images of stored content into images, return the number of images
+    """
+
+    # 分頁儲存模式先組合出最新的 content.htm, 改寫後再匯入各頁面
+    export_content()
+    subject, images = extract_data_images(file_get_contents(config_dir + "content.htm"))
+    if len(images) == 0:
+        return 0
+    shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
+    subject = write_content(subject)
+    if storage == "pages":
+        import_pages(subject)
+    return len(images)
+
+
+def _unix_newlines(subject):
+
+    """Return subject with \r\n and \r line endings replaced by \n
+    """
+
+    if "\r" not in subject:
+        return subject
+    return subject.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def write_content(subject):
+
+    """Normalize headings and save content.htm
+    """
+
+    # 瀏覽器送出的表單內容以 \r\n 換行, 統一存為 \n, content.idx 的位置才能與檔案內容一致
+    subject = _unix_newlines(subject)
+    # 貼入的 data URI 圖片存為 images 目錄下的檔案, content.htm 與各頁面只保留圖檔網址
+    subject = extract_data_images(subject)[0]
+    # 標題整理只在存檔時進行, 並記錄整理後內容的 hash, 讓 parse_content 讀取時不必再改寫 content.htm
+    subject = _normalize_content(subject)
+    _write_normalized(subject)
+    return subject
+
+
+def _write_normalized(subject):
+
+    """Write normalized source to content.htm with its marker
+    """
+
+    subject = _unix_newlines(subject)
+    with open(config_dir + "content.htm", "wb") as f:
+        f.write(subject.encode("utf-8"))
+    # 以讀回的內容計算 hash, 與 parse_content 讀檔後的比對方式一致
+    with open(config_dir + "content_normalized", "w", encoding="utf-8") as f:
+        f.write(_content_hash(file_get_contents(config_dir + "content.htm")))
+    invalidate_content_cache()
+    # 存檔後立即重建 content.idx
+    load_section_index()
+
+
+def main(argv=None):
+
+    """Build the static site from the command line, return the exit status
+    """
+
+    parser = argparse.ArgumentParser(description="Convert content.htm to static html files in content directory")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes, 1 renders serially, 0 uses every CPU core (default: Init.export_jobs)")
+    parser.add_argument("--rollback", action="store_true",
+                        help="swap the previous build back in as content directory")
+    parser.add_argument("--precompress", metavar="DIR", nargs="+",
+                        help="write .gz and .br copies of html, js, css and json files under DIR instead of building")
+    parser.add_argument("--extract-images", action="store_true",
+                        help="move data URI images of content into images directory instead of building")
+    args = parser.parse_args(argv)
+    if args.extract_images:
+        print("%d images extracted" % extract_content_images())
+        return 0
+    if args.precompress:
+        for directory in args.precompress:
+            print("%s: %d files compressed" % (directory, precompress_tree(directory)))
+        return 0
+    if args.rollback:
+        if rollback_static():
+            print("content directory restored from content.previous")
+            return 0
+        print("no previous build to restore", file=sys.stderr)
+        return 1
+    timings = {}
+    start = time.perf_counter()
+    try:
+        written, unchanged, removed, broken, minified = build_static(args.jobs, timings)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    for filename, url in broken:
+        print("broken link: %s -> %s" % (filename, url))
+    for filename, saved in minified:
+        print("minified: %s, %d bytes saved" % (filename, saved))
+    for phase in timings:
+        print("%-8s %8.3f s" % (phase, timings[phase]))
+    print("%-8s %8.3f s" % ("total", time.perf_counter() - start))
+    print("written: %d, unchanged: %d, removed: %d" % (len(written), len(unchanged), len(removed)))
+    if minified:
+        print("minify: %d bytes saved" % sum(saved for filename, saved in minified))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
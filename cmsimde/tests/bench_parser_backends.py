@@ -0,0 +1,47 @@
+"""Report content.htm parse time per MB for each heading parser backend
+
+usage: python3 bench_parser_backends.py [content.htm] [repeat]
+"""
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+def load(argv):
+    if len(argv) > 1:
+        with open(argv[1], encoding="utf-8") as file:
+            return sitegen._normalize_content(file.read())
+    # 未指定檔案時, 以 golden/site.htm 重複組成約 4 MB 的測試內容
+    with open(os.path.join(here, "golden", "site.htm"), encoding="utf-8") as file:
+        subject = sitegen._normalize_content(file.read())
+    return subject * max(1, (4 * 1024 * 1024) // len(subject.encode("utf-8")))
+
+
+def main(argv):
+    subject = load(argv)
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    megabytes = len(subject.encode("utf-8")) / (1024 * 1024)
+    print("content: %.2f MB" % megabytes)
+    for backend in ["stream", "html.parser", "lxml"]:
+        best = None
+        try:
+            for i in range(repeat):
+                start = time.perf_counter()
+                sitegen._split_content(subject, backend)
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+        except Exception as error:
+            print("%-12s unavailable: %s" % (backend, error))
+            continue
+        print("%-12s %8.1f ms/MB" % (backend, best * 1000 / megabytes))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,48 @@
+import base64
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestDataImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.image_dir = sitegen.image_dir
+        sitegen.image_dir = self.tempdir.name + "/images/"
+
+    def tearDown(self):
+        sitegen.image_dir = self.image_dir
+        self.tempdir.cleanup()
+
+    def test_extract(self):
+        data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+        encoded = base64.b64encode(data).decode()
+        subject = "<p><img src=\"data:image/png;base64," + encoded + "\" /> " + \
+                  "<img src='data:image/png;base64," + encoded[:40] + "\n" + encoded[40:] + "'></p>"
+        result, images = sitegen.extract_data_images(subject)
+        filename = hashlib.sha1(data).hexdigest() + ".png"
+        self.assertEqual(images, [filename, filename])
+        self.assertEqual(result, "<p><img src=\"/images/" + filename + "\" /> <img src=\"/images/" + filename + "\"></p>")
+        with open(sitegen.image_dir + filename, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_keep_unknown_or_invalid(self):
+        subject = "<img src=\"data:image/tiff;base64,AAAA\"><img src=\"data:image/png;base64,@@\">"
+        self.assertEqual(sitegen.extract_data_images(subject), (subject, []))
+        self.assertFalse(os.path.exists(sitegen.image_dir))
+
+    def test_no_data_image(self):
+        self.assertEqual(sitegen.extract_data_images("<p>data:image/png</p>"), ("<p>data:image/png</p>", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+def write(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+class TestFingerprintBuild(unittest.TestCase):
+
+    names = ("_curdir", "config_dir", "pages_dir", "image_dir", "storage", "fingerprint_assets",
+             "precompress", "shared_menu", "minify_html")
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.saved = {name: getattr(sitegen, name) for name in self.names}
+        root = self.tempdir.name
+        sitegen._curdir = root
+        sitegen.config_dir = root + "/config/"
+        sitegen.pages_dir = sitegen.config_dir + "pages/"
+        sitegen.image_dir = root + "/images/"
+        sitegen.storage = "htm"
+        sitegen.fingerprint_assets = True
+        sitegen.precompress = False
+        sitegen.shared_menu = False
+        sitegen.minify_html = False
+        write(sitegen.config_dir + "sitetitle", "test")
+        write(sitegen.config_dir + "config", "")
+        write(root + "/cmsimde/static/a.js", "var a;")
+        write(root + "/cmsimde/static/b.js", "var b;")
+        pages = "".join("<h1>P%d</h1><p>page %d</p><script src=\"/static/a.js\"></script>" % (i, i)
+                        for i in range(20))
+        self.content = pages
+        self.save(pages)
+        self.build()
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(sitegen, name, value)
+        sitegen.invalidate_content_cache()
+        sitegen.invalidate_config_cache()
+        self.tempdir.cleanup()
+
+    def save(self, content):
+        write(sitegen.config_dir + "content.htm", content)
+        sitegen.invalidate_content_cache()
+
+    def build(self):
+        return sitegen.build_static(1)[0]
+
+    def pages_written(self):
+        return [name for name in self.build() if name.startswith("P")]
+
+    def test_new_asset_reference(self):
+        # 一個頁面新引用的檔案只重新產生該頁面, 之後的轉檔不再重新產生任何頁面
+        self.save(self.content.replace("<p>page 5</p>", "<p>page 5</p><script src=\"/static/b.js\"></script>"))
+        self.assertEqual(self.pages_written(), ["P5.html"])
+        self.assertEqual(self.pages_written(), [])
+        with open(self.tempdir.name + "/content/P5.html", encoding="utf-8") as f:
+            self.assertIn("b.js?v=", f.read())
+
+    def test_changed_asset(self):
+        # 已引用的檔案內容改變時, 所有頁面的 ?v= 都要更新
+        time.sleep(0.01)
+        write(self.tempdir.name + "/cmsimde/static/a.js", "var a = 1;")
+        self.assertEqual(len(self.pages_written()), 20)
+        self.assertEqual(self.pages_written(), [])
+
+    def test_dropped_asset_reference(self):
+        self.save(self.content.replace("<script src=\"/static/a.js\"></script>", ""))
+        self.assertEqual(len(self.pages_written()), 20)
+        self.assertEqual(sitegen._load_asset_manifest(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import sys
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestMinify(unittest.TestCase):
+
+    def test_comments_and_whitespace(self):
+        self.assertEqual(sitegen.minify("<p>a   b</p>\n\n  <!-- x\n -->  <p>c</p><!--y-->d"),
+                         "<p>a b</p>\n<p>c</p>d")
+
+    def test_keep_blocks(self):
+        for block in ["<pre>  x\n   y <!-- k --></pre>",
+                      "<textarea>  t\n  u</textarea>",
+                      "<script type=\"text/python\">\ndef f():\n    pass  # <!-- z -->\n</script>",
+                      "<style>\nimg {\n    border: 0;\n}\n</style>",
+                      "<!--[if IE]><p>ie</p><![endif]-->"]:
+            with self.subTest(block=block):
+                self.assertEqual(sitegen.minify("<p> a </p>  " + block), "<p> a </p> " + block)
+
+    def test_tag_interiors(self):
+        # 屬性值中的空白與引號中的 > 保留原樣, 只壓縮標註之間的文字
+        self.assertEqual(sitegen.minify('<input value="a  b" title="x\n  y">  <p>a  b</p>'),
+                         '<input value="a  b" title="x\n  y"> <p>a b</p>')
+        self.assertEqual(sitegen.minify("<a title='1 > 0  ok'>x  <!-- c > d -->  y</a>  a < b"),
+                         "<a title='1 > 0  ok'>x y</a> a < b")
+
+    def test_unclosed_pre(self):
+        self.assertEqual(sitegen.minify("<p>  a</p><pre>x\n    y"), "<p> a</p><pre>x\n    y")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestPagesStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.saved = (sitegen.config_dir, sitegen.pages_dir, sitegen.storage)
+        sitegen.config_dir = self.tempdir.name + "/"
+        sitegen.pages_dir = sitegen.config_dir + "pages/"
+        sitegen.storage = "pages"
+        sitegen.invalidate_content_cache()
+
+    def tearDown(self):
+        sitegen.config_dir, sitegen.pages_dir, sitegen.storage = self.saved
+        sitegen.invalidate_content_cache()
+        self.tempdir.cleanup()
+
+    def test_no_content(self):
+        self.assertEqual(sitegen.parse_content(), "Error: no content.htm")
+        self.assertEqual(sitegen.parse_outline(), "Error: no content.htm")
+
+    def test_save_keeps_one_backup(self):
+        with open(sitegen.config_dir + "content.htm", "w", encoding="utf-8") as f:
+            f.write("<h1>One</h1><p>1</p><h1>Two</h1><p>2</p>")
+        self.assertEqual(sitegen.parse_outline(), (["One", "Two"], ["1", "1"]))
+        sitegen.save_page(0, "<h1>One</h1><p>first</p>")
+        sitegen.save_page(1, "<h1>Two</h1><p>second</p>")
+        self.assertEqual(sitegen.read_pages([0, 1]), ["<p>first</p>", "<p>second</p>"])
+        self.assertEqual([name for name in os.listdir(sitegen.pages_dir) if not name.endswith((".htm", ".json"))], [])
+        with open(sitegen.config_dir + "page_backup.htm", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<h1>Two</h1><p>2</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
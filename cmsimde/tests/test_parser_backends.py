@@ -0,0 +1,70 @@
+import glob
+import json
+import os
+import sys
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+golden_dir = os.path.join(here, "golden")
+
+
+def golden_cases():
+    # 每個 .htm 輸入對應一個由原先 parse_content 產生的 .json 結果
+    for filename in sorted(glob.glob(os.path.join(golden_dir, "*.htm"))):
+        with open(filename, encoding="utf-8") as file:
+            subject = file.read()
+        with open(filename[:-4] + ".json", encoding="utf-8") as file:
+            expected = json.load(file)
+        yield os.path.basename(filename), subject, expected
+
+
+class TestParserBackends(unittest.TestCase):
+
+    def check_backend(self, backend):
+        for name, subject, expected in golden_cases():
+            with self.subTest(backend=backend, golden=name):
+                subject = sitegen._normalize_content(subject)
+                head, level, page = sitegen._split_content(subject, backend)
+                self.assertEqual(head, expected["head"])
+                self.assertEqual(level, expected["level"])
+                self.assertEqual(page, expected["page"])
+
+    def test_stream(self):
+        self.check_backend("stream")
+
+    def test_html_parser(self):
+        self.check_backend("html.parser")
+
+    @unittest.skipIf(lxml is None, "lxml is not installed")
+    def test_lxml(self):
+        self.check_backend("lxml")
+
+    def test_backends_agree_on_offsets(self):
+        backends = ["stream", "html.parser"]
+        if lxml is not None:
+            backends.append("lxml")
+        for name, subject, expected in golden_cases():
+            subject = sitegen._normalize_content(subject)
+            reference = sitegen._find_headings(subject, "stream")
+            for backend in backends[1:]:
+                with self.subTest(backend=backend, golden=name):
+                    self.assertEqual(sitegen._find_headings(subject, backend),
+                                     reference)
+
+    def test_no_heading(self):
+        for backend in ["stream", "html.parser"]:
+            self.assertTrue(sitegen._split_content("<p>x</p>", backend).startswith("Error"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+def write(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+def read(filename):
+    with open(filename, encoding="utf-8") as f:
+        return f.read()
+
+
+class TestPublish(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = self.tempdir.name + "/"
+        write(self.root + "content/old.html", "old")
+        write(self.root + "content/same.html", "same")
+        write(self.root + "content/gone/a.html", "gone")
+        write(self.root + "content.staging/new.html", "new")
+        write(self.root + "content.staging/sub/b.html", "b")
+        os.link(self.root + "content/same.html", self.root + "content.staging/same.html")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_content_locked(self):
+        rename = os.rename
+        content_dir = self.root + "content/"
+
+        def locked_rename(source, target):
+            # Windows 上 content 中有開啟中的檔案時無法改名
+            if source == content_dir:
+                raise PermissionError(source)
+            return rename(source, target)
+
+        with mock.patch.object(sitegen, "_exchange_dirs", return_value=False), \
+                mock.patch("os.rename", locked_rename), mock.patch("time.sleep"):
+            sitegen._publish(self.root + "content.staging/", content_dir, self.root + "content.previous/")
+        files = sorted(os.path.relpath(os.path.join(root, name), content_dir)
+                       for root, dirs, names in os.walk(content_dir) for name in names)
+        self.assertEqual(files, ["new.html", "same.html", os.path.join("sub", "b.html")])
+        self.assertEqual(read(content_dir + "new.html"), "new")
+        self.assertFalse(os.path.exists(self.root + "content.staging"))
+        self.assertFalse(os.path.exists(self.root + "content.previous"))
+
+    def test_swap(self):
+        sitegen._publish(self.root + "content.staging/", self.root + "content/", self.root + "content.previous/")
+        self.assertEqual(read(self.root + "content/new.html"), "new")
+        self.assertEqual(read(self.root + "content.previous/old.html"), "old")
+
+
+if __name__ == "__main__":
+    unittest.main()
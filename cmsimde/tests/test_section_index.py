@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestSectionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.config_dir = sitegen.config_dir
+        self.storage = sitegen.storage
+        sitegen.config_dir = self.tempdir.name + "/"
+        sitegen.storage = "htm"
+        sitegen.invalidate_content_cache()
+
+    def tearDown(self):
+        sitegen.config_dir = self.config_dir
+        sitegen.storage = self.storage
+        sitegen.invalidate_content_cache()
+        self.tempdir.cleanup()
+
+    def test_crlf_save(self):
+        # 瀏覽器送出的表單內容以 \r\n 換行
+        source = "<h1>One</h1>\n<p>first\npage</p>\n<h2>Two</h2>\n<p>中文</p>\n"
+        sitegen.write_content(source.replace("\n", "\r\n"))
+        with open(sitegen.config_dir + "content.htm", "rb") as f:
+            self.assertNotIn(b"\r", f.read())
+        index = sitegen.load_section_index()
+        self.assertIsNotNone(index)
+        self.assertEqual([entry["title"] for entry in index["sections"]], ["One", "Two"])
+        self.assertEqual(sitegen.read_pages([0, 1]), ["\n<p>first\npage</p>\n", "\n<p>中文</p>\n"])
+        self.assertTrue(os.path.isfile(sitegen.config_dir + "content.idx"))
+        self.assertEqual([name for name in os.listdir(sitegen.config_dir) if name.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestSlugs(unittest.TestCase):
+
+    def test_duplicates_are_numbered(self):
+        head = ["A", "B", "A", "A"]
+        slugs, registry = sitegen.assign_slugs(head, ["1", "2", "3", "4"], {})
+        self.assertEqual(slugs, ["A-1", "B", "A-2", "A-3"])
+        self.assertEqual([entry[0] for entry in registry["A"]], ["A-1", "A-2", "A-3"])
+
+    def test_unsafe_titles(self):
+        head = ["a/b?c#d", "index", "..", "Q&A: 50%"]
+        slugs = sitegen.assign_slugs(head, ["1", "2", "3", "4"], {})[0]
+        self.assertEqual(slugs, ["a_b_c_d", "index_", "page", "Q&A_ 50_"])
+
+    def test_unsafe_titles_do_not_collide(self):
+        slugs = sitegen.assign_slugs(["a/b", "a?b"], ["1", "2"], {})[0]
+        self.assertEqual(len(set(slugs)), 2)
+
+    def test_case_insensitive_names(self):
+        # Windows 與 macOS 上 Intro.html 與 intro.html 為同一個檔案
+        slugs, registry = sitegen.assign_slugs(["Intro", "intro", "INTRO-1"], ["1", "2", "3"], {})
+        self.assertEqual(slugs, ["Intro", "intro-1", "INTRO-1-1"])
+        self.assertEqual(len(set(slug.casefold() for slug in slugs)), 3)
+        # 舊版 registry 中只有大小寫不同的檔名, 後面的頁面改用新的檔名
+        registry = {"Intro": [["Intro", "x"]], "intro": [["intro", "y"]]}
+        slugs = sitegen.assign_slugs(["Intro", "intro"], ["1", "2"], registry)[0]
+        self.assertEqual(slugs, ["Intro", "intro-1"])
+
+    def test_stable_after_removing_first_duplicate(self):
+        head = ["A", "A", "A"]
+        page = ["first", "second", "third"]
+        slugs, registry = sitegen.assign_slugs(head, page, {})
+        slugs2, registry2 = sitegen.assign_slugs(head[1:], page[1:], registry)
+        self.assertEqual(slugs2, slugs[1:])
+        # 新增的同名頁面取得新的檔名, 既有頁面的網址不變
+        slugs3 = sitegen.assign_slugs(head, ["new"] + page[1:], registry2)[0]
+        self.assertEqual(slugs3[1:], slugs[1:])
+        self.assertNotIn(slugs3[0], slugs[1:])
+
+    def test_stable_when_content_changes(self):
+        head = ["A", "A"]
+        slugs, registry = sitegen.assign_slugs(head, ["1", "2"], {})
+        self.assertEqual(sitegen.assign_slugs(head, ["1 edited", "2"], registry)[0], slugs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, os.path.dirname(os.path.dirname(here)))
+
+import sitegen
+
+
+class TestStaticLinks(unittest.TestCase):
+
+    def test_get_page_links(self):
+        targets = {"Q&A": "Q_A.html", "About": "About.html"}
+        links = []
+        page = sitegen.static_links('<a href="/get_page/Q&amp;A">x</a> <a href="/get_page/Q%26A/1">y</a> '
+                                    '<a href="/get_page/About">z</a> <a href="/get_page/Gone">w</a>', targets, links)
+        self.assertEqual(page, '<a href="Q_A.html">x</a> <a href="Q_A.html">y</a> '
+                               '<a href="About.html">z</a> <a href="/get_page/Gone">w</a>')
+        self.assertEqual([target for url, target in links], ["Q_A.html", "Q_A.html", "About.html", None])
+
+    def test_site_urls(self):
+        self.assertEqual(sitegen.static_links('<img src="/images/a.png"><a href="/downloads/b.7z">b</a>'),
+                         '<img src="./../images/a.png"><a href="./../downloads/b.7z">b</a>')
+
+
+if __name__ == "__main__":
+    unittest.main()
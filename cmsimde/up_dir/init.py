@@ -14,6 +14,24 @@ class Init(object):
     ip = "127.0.0.1"
     dynamic_port = 9443
     static_port = 8443
+    # "htm": all pages are kept in config/content.htm
+    # "pages": each page is kept in config/pages/, content.htm is exported when needed
+    storage = "htm"
+    # heading parser for content.htm: "stream" (no DOM), "html.parser" or "lxml"
+    content_parser = "stream"
+    # worker processes of command line export (python3 cmsimde/sitegen.py), 1 renders serially, 0 uses every CPU core
+    # /generate_pages always renders serially inside the web server process
+    export_jobs = 1
+    # static pages load the menu from one hash-named menu-xxxx.js instead of embedding it
+    shared_menu = False
+    # write .gz (and .br with brotli installed) copies of static html, js, css and json output
+    precompress = False
+    # add ?v=<content hash> to cmsimde/static urls of static pages, served with far-future Cache-Control
+    fingerprint_assets = False
+    # strip comments and collapse whitespace of static pages, keeping pre, textarea, script and style content
+    minify_html = False
+    # extra url rewrites for static pages, {"dynamic site string": "static page string"}
+    static_url_map = {}
     def __init__(self):
         # hope to create downloads and images directories　
         if not os.path.isdir(_curdir + "/downloads"):
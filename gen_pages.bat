@@ -0,0 +1 @@
+python cmsimde/sitegen.py %*
\ No newline at end of file